@@ -0,0 +1,106 @@
+# In-process stand-ins for the Burp Extender API, for running HARbringer
+# outside Burp in the benchmarks.
+# install() registers a `burp` module with the interfaces the extension
+# implements, so harbringer.py can be imported under a standalone Jython.
+# FakeCallbacks records what the extension sends to the site map without
+# keeping the messages unless asked to.
+import sys
+import types
+
+class IBurpExtender(object):
+    pass
+
+class IExtensionStateListener(object):
+    pass
+
+class ITab(object):
+    pass
+
+class IHttpRequestResponse(object):
+    pass
+
+class IHttpService(object):
+    pass
+
+# Registers the fake `burp` module unless the real one is importable
+def install():
+    try:
+        __import__('burp')
+        return
+    except ImportError:
+        pass
+    module = types.ModuleType('burp')
+    for interface in (IBurpExtender, IExtensionStateListener, ITab, IHttpRequestResponse, IHttpService):
+        setattr(module, interface.__name__, interface)
+    sys.modules['burp'] = module
+
+# IExtensionHelpers subset used by the extension
+class FakeHelpers(object):
+    def stringToBytes(self, text):
+        if isinstance(text, bytes):
+            return bytearray(text)
+        return bytearray(text.encode('latin-1', 'replace'))
+
+    def bytesToString(self, data):
+        return bytes(bytearray(data)).decode('latin-1')
+
+# IBurpExtenderCallbacks subset used by the extension
+class FakeCallbacks(object):
+    def __init__(self, keep_messages=False, stdout=None):
+        self.keepMessages = keep_messages
+        self.siteMap = []  # only filled with keep_messages
+        self.siteMapCount = 0
+        self.siteMapBytes = 0
+        self.settings = {}
+        self.tabs = []
+        self.listeners = []
+        self._stdout = stdout or sys.stdout
+
+    def getHelpers(self):
+        return FakeHelpers()
+
+    def getStdout(self):
+        return self._stdout
+
+    def getStderr(self):
+        return sys.stderr
+
+    def setExtensionName(self, name):
+        self.extensionName = name
+
+    def addSuiteTab(self, tab):
+        self.tabs.append(tab)
+
+    def registerExtensionStateListener(self, listener):
+        self.listeners.append(listener)
+
+    def addToSiteMap(self, request_response):
+        self.siteMapCount += 1
+        self.siteMapBytes += len(request_response.getRequest()) + len(request_response.getResponse() or ())
+        if self.keepMessages:
+            self.siteMap.append(request_response)
+
+    def saveExtensionSetting(self, name, value):
+        self.settings[name] = value
+
+    def loadExtensionSetting(self, name):
+        return self.settings.get(name)
+
+    def isInScope(self, url):
+        return True
+
+# Minimal IHttpRequestResponse for code that builds messages without the
+# extension, e.g. the core benchmark backend
+class FakeRequestResponse(object):
+    def __init__(self, host, port, protocol, request, response):
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.request = request
+        self.response = response
+
+    def getRequest(self):
+        return self.request
+
+    def getResponse(self):
+        return self.response
@@ -0,0 +1,376 @@
+# Benchmarks for loading, sorting and importing HAR files.
+# Each workload is a synthetic HAR (see synthetic_har.py) or a given file.
+# Two backends run the same stages:
+# - core: the harcore pipeline the extension is built on, under CPython
+#   or Jython. Entries are streamed into the indexes and built with
+#   MessageBuilder, and the table sort is approximated by sorting the
+#   row index.
+# - extension: harbringer.py itself under a standalone Jython, headless,
+#   with FakeCallbacks in place of Burp. It runs LoadWorker,
+#   HarTableModel behind a JTable's TableRowSorter, and ImportWorker.
+# Results are written as JSON; --compare prints the change against an
+# earlier results file.
+#
+#   python benchmarks/run_benchmarks.py --entries 1000,10000,100000
+#   jython -Djava.awt.headless=true benchmarks/run_benchmarks.py --entries 100000 --threads 4
+#   python benchmarks/run_benchmarks.py --har capture.har --compare benchmarks/results/previous.json
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, HERE)
+
+import fake_burp
+import synthetic_har
+from harcore import (CheckpointStore, ContentCache, HarBodyIndex, HarIndexCache, HarRowIndex, HarSourceIndex,
+                     HarStreamReader, MessageBuilder, StringPool, compact_entry, open_body_store, open_har,
+                     parse_size, read_bodies)
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    from java.lang.management import ManagementFactory, MemoryType
+    from java.lang import System
+except ImportError:
+    ManagementFactory = None
+
+# Table columns timed in the sort stage, as (model column, name)
+SORT_COLUMNS = ((2, 'URL'), (3, 'Status'), (4, 'Length'))
+
+# Peak memory used while a stage runs, in bytes above what was in use when
+# it started, and how much of that is still held when it ends (`retained`,
+# e.g. the loaded table). Uses the JVM heap pools under Jython and
+# tracemalloc under CPython; tracemalloc slows Python down, so the harness
+# measures memory in a separate run of the stage (see measure()).
+class MemoryMeter(object):
+    def __init__(self):
+        self.kind = None
+        if ManagementFactory is not None:
+            self.kind = 'jvm-heap'
+        elif tracemalloc is not None:
+            self.kind = 'tracemalloc'
+        self._baseline = 0
+        self.retained = None
+
+    def separate_pass(self):
+        return self.kind == 'tracemalloc'
+
+    def start(self):
+        gc.collect()
+        if self.kind == 'jvm-heap':
+            System.gc()
+            self._baseline = ManagementFactory.getMemoryMXBean().getHeapMemoryUsage().getUsed()
+            for pool in self._heap_pools():
+                pool.resetPeakUsage()
+        elif self.kind == 'tracemalloc':
+            tracemalloc.start()
+
+    def stop(self):
+        # Returns the peak, or None when memory can't be measured
+        if self.kind == 'jvm-heap':
+            peak = sum(pool.getPeakUsage().getUsed() for pool in self._heap_pools())
+            System.gc()
+            self.retained = max(0, ManagementFactory.getMemoryMXBean().getHeapMemoryUsage().getUsed() - self._baseline)
+            return max(0, peak - self._baseline)
+        if self.kind == 'tracemalloc':
+            gc.collect()
+            self.retained, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return peak
+        return None
+
+    def _heap_pools(self):
+        return [pool for pool in ManagementFactory.getMemoryPoolMXBeans() if pool.getType() == MemoryType.HEAP]
+
+# Runs the harcore pipeline directly
+class CoreBackend(object):
+    name = 'core'
+
+    def __init__(self, threads):
+        self.threads = 1  # serial; the import pool needs the extension
+        self.rows = None
+
+    def load(self, path):
+        self.close()
+        self.rows = HarRowIndex()
+        self.entries = []
+        self.bodies = HarBodyIndex()
+        strings = StringPool()
+        with open_har(path) as f:
+            for entry, spans in HarStreamReader(f).entries():
+                self.entries.append(compact_entry(entry, strings))
+                self.bodies.add(spans)
+                self.rows.add(entry)
+        self.store = open_body_store(path)
+        return len(self.rows)
+
+    def load_cached(self, path, cache):
+        cache.save(path, self.rows, self.entries, self.bodies)
+        started = time.time()
+        cached = cache.load(path)
+        elapsed = time.time() - started
+        return elapsed if cached is not None else None
+
+    def sort(self, column):
+        # The JTable compares getValueAt() values; the row index columns
+        # hold the same values
+        values = {2: self.rows.urls, 3: self.rows.statuses, 4: self.rows.sizes}[column]
+        started = time.time()
+        sorted(range(len(self.rows)), key=values.__getitem__)
+        return time.time() - started
+
+    def import_all(self, callbacks):
+        # Returns (entries imported, site map bytes added)
+        before = callbacks.siteMapBytes
+        builder = MessageBuilder()
+        cache = ContentCache()
+        for index in range(len(self.rows)):
+            raw_bodies = read_bodies(self.store, self.bodies.spans(index), builder.raw_limit())
+            host, port, protocol, request, response, key = builder.build(self.entries[index], raw_bodies, cache)
+            callbacks.addToSiteMap(fake_burp.FakeRequestResponse(host, port, protocol, request, response))
+        return len(self.rows), callbacks.siteMapBytes - before
+
+    def close(self):
+        if self.rows is not None:
+            self.store.close()
+            self.rows = None
+
+# Runs the extension's own workers and table under Jython
+class ExtensionBackend(object):
+    name = 'extension'
+
+    def __init__(self, threads):
+        fake_burp.install()
+        import harbringer
+        import harui
+        self.harbringer = harbringer
+        self.harui = harui
+        self.threads = threads
+        self.extender = None
+
+    def start(self, callbacks, cache):
+        self.extender = self.harbringer.BurpExtender()
+        self.extender.registerExtenderCallbacks(callbacks)
+        self.tab = self.extender.tab
+        self.tab.indexCache = cache
+        self.tab.checkpoints = CheckpointStore(os.path.join(cache.directory, 'checkpoints'))
+
+    def load(self, path):
+        # load_har() without the Swing worker thread and dialogs
+        tab = self.tab
+        tab.close_body_stores()
+        tab.bodyStores = [self.extender.open_body_store(path)]
+        tab.rows = HarRowIndex()
+        tab.entries = []
+        tab.bodyIndex = HarBodyIndex()
+        tab.sources = HarSourceIndex([path])
+        tab.tableModel.setRows(tab.rows, tab.sources)
+        worker = self.harui.LoadWorker(tab, path)
+        worker.doInBackground()
+        if worker.failure is not None:
+            raise worker.failure
+        if worker.cached:
+            tab.rows, tab.entries, tab.bodyIndex = worker.rows, worker.entries, worker.bodies
+            tab.tableModel.setRows(tab.rows)
+        tab.tableModel.publishRows()
+        self.worker = worker
+        return len(tab.rows)
+
+    def load_cached(self, path, cache):
+        # The first load() saved the index to the tab's cache
+        started = time.time()
+        self.load(path)
+        elapsed = time.time() - started
+        return elapsed if self.worker.cached else None
+
+    def sort(self, column):
+        from javax.swing import SortOrder, RowSorter
+        from java.util import Collections
+        sorter = self.tab.table.getRowSorter()
+        started = time.time()
+        sorter.setSortKeys(Collections.singletonList(RowSorter.SortKey(column, SortOrder.ASCENDING)))
+        elapsed = time.time() - started
+        sorter.setSortKeys(None)
+        return elapsed
+
+    def import_all(self, callbacks):
+        before = callbacks.siteMapBytes
+        worker = self.harui.ImportWorker(self.tab, range(self.tab.tableModel.published), self.threads)
+        worker.doInBackground()
+        if worker.failure is not None:
+            raise worker.failure
+        return worker.count, callbacks.siteMapBytes - before
+
+    def close(self):
+        if self.extender is not None:
+            self.tab.close_body_stores()
+
+# Runs `stage` and returns (seconds, result, peak bytes or None). Under
+# tracemalloc the stage is run a second time for the memory figure.
+def measure(meter, stage, memory=True):
+    if not memory or meter.kind is None:
+        started = time.time()
+        result = stage()
+        return time.time() - started, result, None
+    if meter.separate_pass():
+        started = time.time()
+        result = stage()
+        elapsed = time.time() - started
+        meter.start()
+        stage()
+        return elapsed, result, meter.stop()
+    meter.start()
+    started = time.time()
+    result = stage()
+    elapsed = time.time() - started
+    return elapsed, result, meter.stop()
+
+def rate(count, seconds):
+    return round(count / seconds, 1) if seconds > 0 else None
+
+# Runs every stage on one HAR file and returns its results
+def run_workload(label, path, backend, meter, memory, log):
+    cache_dir = tempfile.mkdtemp(prefix='harbringer-bench-')
+    cache = HarIndexCache(cache_dir)
+    callbacks = fake_burp.FakeCallbacks(stdout=log)
+    try:
+        if isinstance(backend, ExtensionBackend):
+            backend.start(callbacks, cache)
+        parse_seconds, count, parse_peak = measure(meter, lambda: backend.load(path), memory)
+        loaded_bytes = meter.retained if parse_peak is not None else None
+        cached_seconds = backend.load_cached(path, cache)
+        sort_ms = {}
+        for column, name in SORT_COLUMNS:
+            sort_ms[name] = round(backend.sort(column) * 1000, 2)
+        import_seconds, (imported, site_map_bytes), import_peak = measure(
+            meter, lambda: backend.import_all(callbacks), memory)
+        return {
+            'workload': label,
+            'path': path,
+            'file_bytes': os.path.getsize(path),
+            'entries': count,
+            'parse_seconds': round(parse_seconds, 3),
+            'parse_entries_per_second': rate(count, parse_seconds),
+            'parse_peak_bytes': parse_peak,
+            'loaded_bytes': loaded_bytes,
+            'cached_load_seconds': round(cached_seconds, 3) if cached_seconds is not None else None,
+            'sort_ms': sort_ms,
+            'import_seconds': round(import_seconds, 3),
+            'import_entries_per_second': rate(imported, import_seconds),
+            'import_peak_bytes': import_peak,
+            'imported': imported,
+            'site_map_bytes': site_map_bytes,
+        }
+    finally:
+        backend.close()
+        shutil.rmtree(cache_dir, True)
+
+# Metrics compared by --compare, and whether a higher value is better
+COMPARED = (('parse_seconds', False), ('parse_entries_per_second', True), ('parse_peak_bytes', False),
+            ('loaded_bytes', False), ('cached_load_seconds', False), ('import_seconds', False),
+            ('import_entries_per_second', True), ('import_peak_bytes', False))
+
+def compare(previous, current, out):
+    before = dict((result['workload'], result) for result in previous['results'])
+    for result in current['results']:
+        old = before.get(result['workload'])
+        if old is None:
+            out.write("%s: not in the previous results\n" % result['workload'])
+            continue
+        out.write("%s:\n" % result['workload'])
+        pairs = [(name, old.get(name), result.get(name), higher) for name, higher in COMPARED]
+        pairs += [('sort_ms.' + name, old.get('sort_ms', {}).get(name), result['sort_ms'].get(name), False)
+                  for column, name in SORT_COLUMNS]
+        for name, old_value, new_value, higher in pairs:
+            if not old_value or new_value is None:
+                continue
+            change = (new_value - old_value) * 100.0 / old_value
+            better = (change > 0) == higher
+            out.write("  %-28s %14s -> %-14s %+7.1f%% %s\n" % (
+                name, old_value, new_value, change, "better" if better and change else ""))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark HAR loading, sorting and importing.")
+    parser.add_argument('--entries', default='1000,10000',
+                        help="comma-separated synthetic HAR sizes, e.g. 1000,100000,1000000")
+    parser.add_argument('--har', action='append', default=[], help="benchmark this HAR file too (repeatable)")
+    parser.add_argument('--binary-ratio', type=float, default=0.3)
+    parser.add_argument('--body-size', default='2k', help="mean synthetic body size")
+    parser.add_argument('--large', type=int, default=0, help="large single responses per synthetic HAR")
+    parser.add_argument('--large-size', default='16m')
+    parser.add_argument('--gzip', action='store_true', help="gzip the synthetic HARs")
+    parser.add_argument('--backend', choices=('auto', 'core', 'extension'), default='auto',
+                        help="auto uses the extension under Jython and the core otherwise")
+    parser.add_argument('--threads', type=int, default=1, help="import threads (extension backend)")
+    parser.add_argument('--no-memory', action='store_true', help="skip the peak memory measurements")
+    parser.add_argument('--work-dir', default=None, help="where synthetic HARs are kept between runs")
+    parser.add_argument('--output', default=None, help="results file (default benchmarks/results/<time>.json)")
+    parser.add_argument('--compare', default=None, help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    backend_name = args.backend
+    if backend_name == 'auto':
+        backend_name = 'extension' if sys.platform.startswith('java') else 'core'
+    backend = (ExtensionBackend if backend_name == 'extension' else CoreBackend)(args.threads)
+    meter = MemoryMeter()
+    work_dir = args.work_dir or os.path.join(tempfile.gettempdir(), 'harbringer-bench')
+    if not os.path.isdir(work_dir):
+        os.makedirs(work_dir)
+
+    workloads = []
+    for entries in [int(value) for value in args.entries.split(',') if value.strip()]:
+        label = 'synthetic-%d-b%s-s%s-l%dx%s%s' % (entries, args.binary_ratio, args.body_size, args.large,
+                                                    args.large_size, '-gz' if args.gzip else '')
+        path = os.path.join(work_dir, label + ('.har.gz' if args.gzip else '.har'))
+        if not os.path.exists(path):
+            sys.stderr.write("Generating %s\n" % path)
+            synthetic_har.generate(path + '.tmp' + ('.gz' if args.gzip else ''), entries, args.binary_ratio,
+                                   parse_size(args.body_size), large=args.large, large_size=parse_size(args.large_size))
+            os.rename(path + '.tmp' + ('.gz' if args.gzip else ''), path)
+        workloads.append((label, path))
+    workloads += [(os.path.basename(path), path) for path in args.har]
+
+    results = []
+    with open(os.devnull, 'w') as log:
+        for label, path in workloads:
+            sys.stderr.write("Running %s (%s backend)\n" % (label, backend.name))
+            result = run_workload(label, path, backend, meter, not args.no_memory, log)
+            sys.stderr.write("  parse %.2fs, import %.2fs (%s entries/s), sort URL %s ms\n" % (
+                result['parse_seconds'], result['import_seconds'], result['import_entries_per_second'],
+                result['sort_ms']['URL']))
+            results.append(result)
+
+    report = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'backend': backend.name,
+        'threads': backend.threads,
+        'memory': None if args.no_memory else meter.kind,
+        'results': results,
+    }
+    output = args.output or os.path.join(HERE, 'results', time.strftime('%Y%m%d-%H%M%S') + '.json')
+    if not os.path.isdir(os.path.dirname(os.path.abspath(output))):
+        os.makedirs(os.path.dirname(os.path.abspath(output)))
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    sys.stderr.write("Results written to %s\n" % output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report, sys.stdout)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+# Generator of synthetic HAR files for the benchmarks.
+# Entries are written one at a time, so a million-entry HAR never has to
+# fit in memory. The output is reproducible for a given seed: a mix of
+# first- and third-party hosts, text bodies (HTML/JSON with characters
+# that need escaping), base64 binary bodies, optional POST bodies and a
+# few large single responses.
+#
+#   python synthetic_har.py out.har --entries 100000 --binary-ratio 0.3
+#   python synthetic_har.py out.har.gz --entries 10000 --large 2 --large-size 50m
+import argparse
+import base64
+import gzip
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from harcore import parse_size
+
+HOSTS = ('app.example.com', 'api.example.com', 'static.example.com', 'www.google-analytics.com',
+         'cdn.jsdelivr.net', 'fonts.gstatic.com', 'connect.facebook.net', 'media.example-cdn.net')
+TEXT_TYPES = ('text/html; charset=utf-8', 'application/json', 'text/css', 'application/javascript')
+BINARY_TYPES = ('image/png', 'image/jpeg', 'font/woff2', 'application/octet-stream')
+WORDS = (u'lorem', u'ipsum', u'dolor', u'sit', u'amet', u'"quoted"', u'back\\slash', u'tab\there',
+         u'line\nbreak', u'caf\u00e9', u'\u65e5\u672c', u'<div class="x">', u'{"k": [1, 2]}')
+
+# Writes a synthetic HAR to `path` (gzip-compressed if it ends in .gz) and
+# returns the number of entries written
+def generate(path, entries=1000, binary_ratio=0.3, body_size=2048, post_ratio=0.1,
+             large=0, large_size=16 * 1024 * 1024, seed=1):
+    rng = random.Random(seed)
+    large_at = set(rng.sample(range(entries), min(large, entries)))
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wb') as f:
+        f.write(b'{"log": {"version": "1.2", "creator": {"name": "synthetic_har", "version": "1"},'
+                b' "pages": [], "entries": [\n')
+        for index in range(entries):
+            size = large_size if index in large_at else max(0, int(rng.expovariate(1.0 / body_size)))
+            entry = make_entry(rng, index, size, rng.random() < binary_ratio, rng.random() < post_ratio)
+            if index:
+                f.write(b',\n')
+            f.write(json.dumps(entry).encode('ascii'))
+        f.write(b'\n]}}\n')
+    return entries
+
+def make_entry(rng, index, size, binary, post):
+    host = rng.choice(HOSTS)
+    method = 'POST' if post else rng.choice(('GET', 'GET', 'GET', 'HEAD', 'OPTIONS'))
+    url = 'https://%s/%s/%d?page=%d&q=%s' % (host, rng.choice(('api/v1/items', 'assets', 'users', 'search')),
+                                              index % 5000, rng.randint(1, 50), rng.choice(WORDS[:5]))
+    request = {
+        'method': method,
+        'url': url,
+        'httpVersion': 'HTTP/1.1',
+        'headers': [{'name': 'Host', 'value': host},
+                    {'name': 'User-Agent', 'value': 'Mozilla/5.0 (synthetic)'},
+                    {'name': 'Accept', 'value': '*/*'},
+                    {'name': 'Cookie', 'value': 'session=%08x' % rng.getrandbits(32)}],
+        'queryString': [],
+        'cookies': [],
+        'headersSize': -1,
+        'bodySize': 0,
+    }
+    if post:
+        text = json.dumps({'id': index, 'name': text_body(rng, 64)})
+        request['postData'] = {'mimeType': 'application/json', 'text': text}
+        request['bodySize'] = len(text)
+
+    if binary:
+        mime_type = rng.choice(BINARY_TYPES)
+        data = bytes(bytearray(rng.getrandbits(8) for _ in range(min(size, 4096))))
+        data = (data * (size // max(len(data), 1) + 1))[:size]
+        content = {'size': size, 'mimeType': mime_type, 'encoding': 'base64',
+                   'text': base64.b64encode(data).decode('ascii')}
+    else:
+        mime_type = rng.choice(TEXT_TYPES)
+        text = text_body(rng, size)
+        content = {'size': len(text.encode('utf-8')), 'mimeType': mime_type, 'text': text}
+    status = rng.choice((200, 200, 200, 200, 204, 301, 304, 404, 500))
+    response = {
+        'status': status,
+        'statusText': 'OK' if status == 200 else 'Other',
+        'httpVersion': 'HTTP/1.1',
+        'headers': [{'name': 'Content-Type', 'value': mime_type},
+                    {'name': 'Cache-Control', 'value': 'max-age=3600'},
+                    {'name': 'Content-Length', 'value': str(content['size'])}],
+        'cookies': [],
+        'content': content,
+        'redirectURL': '',
+        'headersSize': -1,
+        'bodySize': content['size'],
+    }
+    return {'startedDateTime': '2024-01-01T00:00:00.000Z', 'time': rng.randint(5, 500),
+            'request': request, 'response': response, 'cache': {}, 'timings': {'send': 0, 'wait': 1, 'receive': 1}}
+
+def text_body(rng, size):
+    # About `size` characters of text; long bodies repeat a random block
+    block = u' '.join(rng.choice(WORDS) for _ in range(min(size, 2048) // 6 + 1))
+    return (block * (size // max(len(block), 1) + 1))[:size]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic HAR file for benchmarking.")
+    parser.add_argument('path', help="output file; .gz is gzip-compressed")
+    parser.add_argument('--entries', type=int, default=1000)
+    parser.add_argument('--binary-ratio', type=float, default=0.3, help="share of base64 binary bodies")
+    parser.add_argument('--body-size', default='2k', help="mean body size, e.g. 2k")
+    parser.add_argument('--post-ratio', type=float, default=0.1, help="share of POST requests with a body")
+    parser.add_argument('--large', type=int, default=0, help="number of large single responses")
+    parser.add_argument('--large-size', default='16m', help="size of each large response")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+    generate(args.path, args.entries, args.binary_ratio, parse_size(args.body_size), args.post_ratio,
+             args.large, parse_size(args.large_size), args.seed)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
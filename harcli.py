@@ -0,0 +1,156 @@
+# Command line HAR converter built on harcore, for use outside Burp.
+# Streams a HAR file (plain, gzip, zip or zstd) into raw HTTP request and
+# response files, or into NDJSON with one entry per line and the message
+# bytes base64-encoded. The import rule options are the same as in the
+# extension's Import Rules dialog, and --shard splits the entries between
+# several runs over the same file. Entries that can't be converted are
+# skipped and counted; an unreadable or malformed HAR file ends the run
+# with exit status 1.
+#
+#   python harcli.py capture.har.gz --out-dir raw/ --exclude-mime 'image/*'
+#   python harcli.py capture.har --ndjson - --shard 0/4 | gzip > part0.ndjson.gz
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+import zipfile
+
+from harcore import (ImportRules, MessageBuilder, RateLimitedLog, StageStats, format_duration, format_stats,
+                     iter_messages, open_har)
+
+# Errors opening or reading the HAR file (or writing the output), which
+# end the run
+READ_ERRORS = (IOError, OSError, ValueError, zipfile.BadZipfile)
+
+# Writes each request and response to <index>.request / <index>.response
+class RawFileWriter(object):
+    def __init__(self, directory):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.directory = directory
+
+    def write(self, index, host, port, protocol, request, response):
+        for suffix, message in (('request', request), ('response', response)):
+            with open(os.path.join(self.directory, '%06d.%s' % (index, suffix)), 'wb') as f:
+                f.write(message)
+
+    def close(self):
+        pass
+
+# Writes one JSON object per entry and line, with base64 message bytes
+class NdjsonWriter(object):
+    def __init__(self, path):
+        if path == '-':
+            self._f = getattr(sys.stdout, 'buffer', sys.stdout)
+        else:
+            self._f = open(path, 'wb')
+
+    def write(self, index, host, port, protocol, request, response):
+        line = json.dumps({
+            'index': index,
+            'protocol': protocol,
+            'host': host,
+            'port': port,
+            'request': base64.b64encode(request).decode('ascii'),
+            'response': base64.b64encode(response).decode('ascii'),
+        }, sort_keys=True)
+        self._f.write(line.encode('utf-8') + b'\n')
+
+    def close(self):
+        if self._f is not getattr(sys.stdout, 'buffer', sys.stdout):
+            self._f.close()
+        else:
+            self._f.flush()
+
+# Parses "I/N" into (I, N); raises ValueError if invalid
+def parse_shard(text):
+    shard, count = [int(value) for value in text.split('/')]
+    if not 0 <= shard < count:
+        raise ValueError("Invalid shard: %s" % text)
+    return shard, count
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Convert a HAR file into raw HTTP messages.")
+    parser.add_argument('har', help="HAR file, optionally gzip, zip or zstd compressed")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument('--out-dir', help="write NNNNNN.request / NNNNNN.response files to this directory")
+    output.add_argument('--ndjson', help="write NDJSON to this file, or - for stdout")
+    parser.add_argument('--include-host', default='', help="host globs to keep, e.g. '*.example.com'")
+    parser.add_argument('--exclude-host', default='', help="host globs to drop")
+    parser.add_argument('--method', default='', help="methods to keep, e.g. 'GET,POST'")
+    parser.add_argument('--include-mime', default='', help="response MIME type globs to keep, e.g. 'text/*'")
+    parser.add_argument('--exclude-mime', default='', help="response MIME type globs to drop, e.g. 'image/*'")
+    parser.add_argument('--status', default='', help="status code or range to keep, e.g. '200-399'")
+    parser.add_argument('--max-body-size', default='', help="truncate bodies over this size, e.g. '1m'")
+    parser.add_argument('--shard', default=None, help="only write entries I, I+N, I+2N... given as I/N")
+    parser.add_argument('--stats', default=None, help="write per-stage timings as JSON to this file")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        rules = ImportRules({
+            'includeHosts': args.include_host,
+            'excludeHosts': args.exclude_host,
+            'methods': args.method,
+            'includeMimeTypes': args.include_mime,
+            'excludeMimeTypes': args.exclude_mime,
+            'status': args.status,
+            'maxBodySize': args.max_body_size,
+        })
+        shard = parse_shard(args.shard) if args.shard else None
+    except ValueError as e:
+        sys.stderr.write("Error: %s\n" % e)
+        return 2
+
+    try:
+        open_har(args.har).close()
+    except READ_ERRORS as e:
+        sys.stderr.write("Error: cannot read %s: %s\n" % (args.har, e))
+        return 1
+
+    if args.out_dir:
+        writer = RawFileWriter(args.out_dir)
+    else:
+        writer = NdjsonWriter(args.ndjson)
+
+    stats = StageStats() if args.stats else None
+    error_log = RateLimitedLog(lambda message: sys.stderr.write(message + "\n"), 1.0)
+    failed = []
+
+    def entry_error(index, stage, e):
+        failed.append(index)
+        error_log.log("Error in entry %d (%s): %s" % (index, stage, e))
+
+    started = time.time()
+    count = 0
+    try:
+        for index, entry, host, port, protocol, request, response in iter_messages(
+                args.har, rules, MessageBuilder(rules.maxBodySize), shard, stats, entry_error):
+            if stats is None:
+                writer.write(index, host, port, protocol, request, response)
+            else:
+                write_started = time.time()
+                writer.write(index, host, port, protocol, request, response)
+                stats.add('write', time.time() - write_started, len(request) + len(response))
+            count += 1
+    except READ_ERRORS as e:
+        sys.stderr.write("Error after %d entries: %s\n" % (count, e))
+        return 1
+    finally:
+        writer.close()
+    elapsed = time.time() - started
+    sys.stderr.write("Wrote %d entries in %s (%.0f entries/s)%s\n" % (
+        count, format_duration(elapsed), count / elapsed if elapsed > 0 else 0.0,
+        ", %d entries could not be converted" % len(failed) if failed else ""))
+    if stats is not None:
+        snapshot = stats.snapshot()
+        with open(args.stats, 'w') as f:
+            json.dump(snapshot, f, indent=2, sort_keys=True)
+        sys.stderr.write(format_stats(snapshot) + "\n")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1899 @@
+# Core of HARbringer: streaming HAR parsing, indexes, filtering, import
+# rules and raw HTTP message building. Pure Python with no Burp, Swing or
+# Java imports, so it runs under CPython as well as Jython; the Burp
+# extension (harbringer.py) and the command line tool (harcli.py) are both
+# built on it.
+import base64
+import codecs
+import gzip
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import zipfile
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import chain, compress, repeat
+from operator import and_, contains, eq, ge, le
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    from urlparse import urlsplit
+except ImportError:
+    from urllib.parse import urlsplit
+
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
+
+try:
+    from itertools import imap
+except ImportError:
+    imap = map
+
+# Raised when a HAR file ends in the middle of an entry or value, which for
+# a file that is still being written means "try again later"
+class TruncatedHarError(ValueError):
+    pass
+
+# Incremental reader for HAR files.
+# Walks log.entries one entry at a time so only the entry currently being
+# parsed is held in memory, instead of json.load()ing the whole file.
+# Request and response bodies are not parsed at all: their location in the
+# file is recorded and the entry is decoded with those strings left empty,
+# so they can be read later on demand (see open_body_store). Bodies are
+# not kept in the buffer either, so a large body costs one pass over its
+# bytes and no more memory than a chunk.
+class HarStreamReader(object):
+    CHUNK_SIZE = 1024 * 1024
+
+    # JSON paths inside an entry whose string values are bodies
+    BODY_PATHS = {
+        (b'request', b'postData', b'text'): 0,
+        (b'response', b'content', b'text'): 1,
+    }
+
+    _STRUCTURAL = re.compile(b'[{}\\[\\]"]')
+    _ENTRY_TOKENS = re.compile(b'[{}\\[\\]",:]')
+    _SCALAR_END = re.compile(b'[,}\\]\\s]')
+    # The contents of a JSON string, up to its closing quote
+    _STRING_BODY = re.compile(b'[^"\\\\]*(?:\\\\.[^"\\\\]*)*', re.S)
+    _WHITESPACE = b' \t\r\n'
+
+    # `offset` is the position `f` has been seeked to, for resuming at an
+    # offset returned by entries_start() or follow()
+    def __init__(self, f, chunk_size=None, offset=0):
+        self._f = f
+        self._chunk_size = chunk_size or self.CHUNK_SIZE
+        self._buf = b''
+        self._base = offset  # file offset of self._buf[0]
+        self._pos = offset  # file offset of the next unread byte
+        self._eof = False
+        self.closed = False  # follow() reached the end of log.entries
+
+    # Yields (entry, bodies) for every element of log.entries, where bodies
+    # is a (request, response) pair of (offset, length, escaped) spans of
+    # the raw JSON string contents in the file, or None when there is no
+    # body. `escaped` is 1 when the string contains escape sequences.
+    def entries(self):
+        if self.entries_start() is None:
+            return
+        while True:
+            c = self._peek()
+            if c == b']':
+                self._pos += 1
+                return
+            end, bodies, metadata = self._scan_entry()
+            entry = json.loads(metadata)
+            self._pos = end
+            yield entry, bodies
+            if not self._comma_or(b']'):
+                return
+
+    def entries_start(self):
+        # Moves to the first element of log.entries and returns its offset,
+        # or None if the file has no log.entries
+        self._skip_bom()
+        self._expect(b'{')
+        for key in self._object_keys():
+            if key != b'log':
+                self._skip_value()
+                continue
+            self._expect(b'{')
+            for log_key in self._object_keys():
+                if log_key != b'entries':
+                    self._skip_value()
+                    continue
+                self._expect(b'[')
+                return self._pos
+            return None
+        return None
+
+    # Yields (entry, bodies, end) like entries(), from the current position
+    # of a file that may still be growing, where `end` is the offset to
+    # resume from after the entry. Reads elements of log.entries, or with
+    # `ndjson` entry objects separated by newlines, until the end of the
+    # array (setting `closed`) or the end of the data read so far. An entry
+    # cut off by the end of the file raises TruncatedHarError.
+    def follow(self, ndjson=False):
+        while True:
+            c = self._peek(True)
+            if not c:
+                return
+            if c == b',' and not ndjson:
+                self._pos += 1
+                continue
+            if c == b']' and not ndjson:
+                self._pos += 1
+                self.closed = True
+                return
+            if c != b'{':
+                raise ValueError("Invalid HAR file: unexpected '%s' at offset %d" % (c.decode('latin-1'), self._pos))
+            end, bodies, metadata = self._scan_entry()
+            entry = json.loads(metadata)
+            self._pos = end
+            yield entry, bodies, end
+
+    def _fill(self, keep):
+        # Drop everything before `keep` and append the next chunk. A chunk
+        # is at least as large as what is kept, so a value spanning many
+        # chunks doubles the buffer each time instead of being copied once
+        # per chunk.
+        if self._eof:
+            return False
+        drop = keep - self._base
+        chunk = self._f.read(max(self._chunk_size, len(self._buf) - max(drop, 0)))
+        if not chunk:
+            self._eof = True
+            return False
+        if drop > 0:
+            self._buf = self._buf[drop:] + chunk
+            self._base = keep
+        else:
+            self._buf += chunk
+        return True
+
+    def position(self):
+        # Number of (decompressed) bytes consumed so far
+        return self._pos
+
+    def _slice(self, start, end):
+        return self._buf[start - self._base:end - self._base]
+
+    def _byte(self, offset):
+        return self._buf[offset - self._base:offset - self._base + 1]
+
+    def _peek(self, eof_ok=False):
+        # Skip whitespace and return the next byte without consuming it;
+        # b'' at the end of the file if `eof_ok`
+        while True:
+            i = self._pos - self._base
+            n = len(self._buf)
+            while i < n and self._buf[i:i + 1] in self._WHITESPACE:
+                i += 1
+            self._pos = self._base + i
+            if i < n:
+                return self._buf[i:i + 1]
+            if not self._fill(self._pos):
+                if eof_ok:
+                    return b''
+                raise TruncatedHarError("Unexpected end of HAR file at offset %d" % self._pos)
+
+    def _skip_bom(self):
+        while len(self._buf) < 3 and self._fill(0):
+            pass
+        if self._buf[:3] == b'\xef\xbb\xbf':
+            self._pos = 3
+
+    def _expect(self, token):
+        c = self._peek()
+        if c != token:
+            raise ValueError("Invalid HAR file: expected '%s' at offset %d" % (token.decode('ascii'), self._pos))
+        self._pos += 1
+
+    def _comma_or(self, close):
+        c = self._peek()
+        self._pos += 1
+        if c == b',':
+            return True
+        if c == close:
+            return False
+        raise ValueError("Invalid HAR file: unexpected '%s' at offset %d" % (c.decode('latin-1'), self._pos - 1))
+
+    def _object_keys(self):
+        # Yields each key of the object being read, leaving the reader
+        # positioned at its value
+        if self._peek() == b'}':
+            self._pos += 1
+            return
+        while True:
+            if self._peek() != b'"':
+                raise ValueError("Invalid HAR file: expected object key at offset %d" % self._pos)
+            end = self._scan_string(self._pos)
+            key = self._slice(self._pos + 1, end - 1)
+            self._pos = end
+            self._expect(b':')
+            yield key
+            if not self._comma_or(b'}'):
+                return
+
+    def _skip_value(self):
+        self._peek()
+        self._pos = self._scan_value()
+
+    def _scan_string(self, start, keep=None):
+        # Returns the offset just past the closing quote of the string at `start`
+        if keep is None:
+            keep = start
+        i = start + 1
+        while True:
+            j = self._buf.find(b'"', i - self._base)
+            if j < 0:
+                i = self._base + len(self._buf)
+                if not self._fill(keep):
+                    raise TruncatedHarError("Unterminated string at offset %d" % start)
+                continue
+            # An escaped quote is preceded by an odd number of backslashes
+            k = j
+            while self._buf[k - 1:k] == b'\\':
+                k -= 1
+            if (j - k) % 2 == 0:
+                return self._base + j + 1
+            i = self._base + j + 1
+
+    def _skip_string(self, start):
+        # Like _scan_string, but drops the string from the buffer as it is
+        # scanned; returns (offset past the closing quote, escaped)
+        escaped = False
+        i = start + 1
+        while True:
+            buf = self._buf
+            end = self._STRING_BODY.match(buf, i - self._base).end()
+            escaped = escaped or buf.find(b'\\', i - self._base, end) >= 0
+            if buf[end:end + 1] == b'"':
+                return self._base + end + 1, escaped
+            # The end of the data read so far, or a backslash escaping the
+            # first byte of the next chunk
+            i = self._base + end
+            if not self._fill(i):
+                raise TruncatedHarError("Unterminated string at offset %d" % start)
+
+    def _scan_entry(self):
+        # Like _scan_value for one entry, returning (end, bodies, metadata):
+        # the spans of the non-empty strings found at BODY_PATHS, and the
+        # entry's JSON with those strings cut out (left as ""). Only the
+        # metadata since `mark` is kept in the buffer; what comes before a
+        # body is moved to `parts` and the body itself is skipped.
+        start = self._pos
+        if self._byte(start) != b'{':
+            end = self._scan_value()
+            return end, (None, None), self._slice(start, end)
+        bodies = [None, None]
+        parts = []
+        mark = start
+        kinds = []  # b'{' or b'[' for each open container
+        keys = []  # current key of each open object, None for arrays
+        expect_key = False
+        i = start
+        while True:
+            m = self._ENTRY_TOKENS.search(self._buf, i - self._base)
+            if not m:
+                i = self._base + len(self._buf)
+                if not self._fill(mark):
+                    raise TruncatedHarError("Unterminated entry at offset %d" % start)
+                continue
+            c = m.group()
+            i = self._base + m.end()
+            if c == b'"':
+                slot = None
+                if not expect_key and len(keys) == 3:
+                    slot = self.BODY_PATHS.get(tuple(keys))
+                if slot is None:
+                    end = self._scan_string(i - 1, mark)
+                    if expect_key:
+                        keys[-1] = self._slice(i, end - 1)
+                else:
+                    parts.append(self._slice(mark, i))
+                    end, escaped = self._skip_string(i - 1)
+                    mark = end - 1
+                    if end - 1 > i:
+                        bodies[slot] = (i, end - 1 - i, int(escaped))
+                i = end
+            elif c == b':':
+                expect_key = False
+            elif c == b',':
+                expect_key = kinds[-1] == b'{'
+            elif c == b'{' or c == b'[':
+                kinds.append(c)
+                keys.append(b'' if c == b'{' else None)
+                expect_key = c == b'{'
+            else:
+                kinds.pop()
+                keys.pop()
+                expect_key = False
+                if not kinds:
+                    parts.append(self._slice(mark, i))
+                    return i, tuple(bodies), b''.join(parts)
+
+    def _scan_value(self):
+        # Returns the offset just past the value starting at self._pos
+        start = self._pos
+        c = self._byte(start)
+        if c == b'"':
+            return self._scan_string(start)
+        if c not in (b'{', b'['):
+            while True:
+                m = self._SCALAR_END.search(self._buf, start - self._base)
+                if m:
+                    return self._base + m.start()
+                if not self._fill(start):
+                    return self._base + len(self._buf)
+        depth = 0
+        i = start
+        while True:
+            m = self._STRUCTURAL.search(self._buf, i - self._base)
+            if not m:
+                i = self._base + len(self._buf)
+                if not self._fill(start):
+                    raise TruncatedHarError("Unterminated value at offset %d" % start)
+                continue
+            c = m.group()
+            i = self._base + m.end()
+            if c == b'"':
+                i = self._scan_string(i - 1, start)
+            elif c in (b'{', b'['):
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return i
+
+# Compact index of where each entry's bodies are in the HAR file.
+# Six longs per entry, offset/length/escaped for the request body then the
+# response body, with an offset of -1 when the entry has no such body.
+class HarBodyIndex(object):
+    __slots__ = ('_spans',)
+
+    NO_BODY = (-1, 0, 0)
+
+    def __init__(self):
+        self._spans = array('l')
+
+    def __len__(self):
+        return len(self._spans) // 6
+
+    def add(self, bodies):
+        for span in bodies:
+            self._spans.extend(span or self.NO_BODY)
+
+    def spans(self, index):
+        i = index * 6
+        spans = self._spans
+        return tuple(spans[i:i + 3]), tuple(spans[i + 3:i + 6])
+
+    def extend(self, other):
+        # Appends all entries of another HarBodyIndex
+        self._spans.extend(other._spans)
+
+    def __getstate__(self):
+        return (list(self._spans),)
+
+    def __setstate__(self, state):
+        self._spans = array('l', state[0])
+
+# Which file each entry came from, when a table is merged from several HAR
+# files. A file's entries are added as one run of consecutive indexes, so
+# only the first index of each run is kept; a run is registered before its
+# entries are added.
+class HarSourceIndex(object):
+    __slots__ = ('paths', '_starts', '_sources')
+
+    def __init__(self, paths=()):
+        self.paths = list(paths)
+        self._starts = array('i')
+        self._sources = array('i')
+        if len(self.paths) == 1:
+            self.add_run(0, 0)
+
+    def add_run(self, start, source):
+        # Entries from `start` on come from paths[source]
+        if self._sources and self._sources[-1] == source:
+            return
+        self._sources.append(source)
+        self._starts.append(start)
+
+    def source(self, index):
+        return self._sources[bisect_right(self._starts, index) - 1]
+
+    def path(self, index):
+        return self.paths[self.source(index)]
+
+# File names picked up when a directory is loaded: plain HAR files, gzip
+# and zstd compressed ones, and zip archives (.har.zip included)
+HAR_SUFFIXES = ('.har', '.har.gz', '.zip', '.har.zst')
+
+# Whether a .zip found in a directory has a .har member, so unrelated
+# archives are skipped. An unreadable archive is kept, so its load error
+# shows in the file list instead of the file silently missing.
+def zip_has_har(path):
+    try:
+        archive = zipfile.ZipFile(path)
+    except (IOError, OSError, zipfile.BadZipfile):
+        return True
+    try:
+        return any(name.lower().endswith('.har') for name in archive.namelist())
+    finally:
+        archive.close()
+
+# Expands `paths` to a list of HAR files: files are kept as given, and
+# directories are searched recursively for names ending in HAR_SUFFIXES
+# (zip archives only if they contain a .har file).
+# A file reached more than once (say, a directory and a file inside it)
+# is listed only the first time.
+def find_har_files(paths):
+    found = []
+    seen = set()
+
+    def add(path):
+        key = os.path.normcase(os.path.realpath(path))
+        if key not in seen:
+            seen.add(key)
+            found.append(path)
+
+    for path in paths:
+        if not os.path.isdir(path):
+            add(path)
+            continue
+        for directory, names, files in os.walk(path):
+            names.sort()
+            for name in sorted(files):
+                lower = name.lower()
+                if lower.endswith(HAR_SUFFIXES):
+                    found_path = os.path.join(directory, name)
+                    if not lower.endswith('.zip') or zip_has_har(found_path):
+                        add(found_path)
+    return found
+
+# Compressed HAR formats, detected from the first bytes of the file
+HAR_MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'PK\x03\x04', 'zip'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+)
+
+# Returns 'gzip', 'zip', 'zstd' or 'json' for the HAR file at path
+def har_format(path):
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    for prefix, name in HAR_MAGIC:
+        if magic.startswith(prefix):
+            return name
+    return 'json'
+
+# Opens a HAR file for streaming, decompressing gzip, zip and zstd inputs
+# on the fly so nothing is written to disk. For a zip archive the first
+# .har member (or else the first member) is read. zstd needs the optional
+# `zstandard` module, which is only available outside Jython.
+def open_har(path):
+    fmt = har_format(path)
+    if fmt == 'gzip':
+        return gzip.GzipFile(path, 'rb')
+    if fmt == 'zip':
+        archive = zipfile.ZipFile(path)
+        try:
+            names = [info.filename for info in archive.infolist() if not info.filename.endswith('/')]
+            if not names:
+                raise ValueError("No HAR file found in zip archive")
+            har_names = [name for name in names if name.lower().endswith('.har')]
+            return archive.open((har_names or names)[0])
+        finally:
+            archive.close()
+    if fmt == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("Reading zstd-compressed HAR files requires the 'zstandard' module")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+# Follows a HAR file that is still being written: either a HAR whose
+# log.entries array is being appended to, or NDJSON with one HAR entry per
+# line. Each poll() resumes from a cursor just past the last complete entry,
+# so only newly appended bytes are parsed; an entry still being written is
+# left for the next poll. Body spans are file offsets as usual, so the file
+# must be uncompressed.
+class HarFollower(object):
+    NDJSON_SUFFIXES = ('.ndjson', '.jsonl')
+    HEAD_SIZE = 4096
+    FIRST_KEY = re.compile(b'(?:\xef\xbb\xbf)?\\s*\\{\\s*"([^"\\\\]*)"')
+
+    def __init__(self, path):
+        if har_format(path) != 'json':
+            raise ValueError("Only uncompressed HAR and NDJSON files can be followed")
+        self.path = path
+        self.ndjson = None  # detected once the file has data
+        self.cursor = None  # offset to resume reading entries from
+        self.size = 0  # file size when the last poll caught up
+        self.closed = False  # the HAR's entries array has been closed
+
+    def poll(self, limit=None):
+        # Returns the (entry, bodies) pairs completed since the last poll,
+        # at most `limit` of them
+        size = os.path.getsize(self.path)
+        if size < self.size:
+            raise ValueError("%s was truncated while being followed" % self.path)
+        if size == self.size:
+            return []
+        found = []
+        with open(self.path, 'rb') as f:
+            if self.cursor is None and not self._start(f):
+                return found
+            f.seek(self.cursor)
+            reader = HarStreamReader(f, offset=self.cursor)
+            try:
+                for entry, bodies, end in reader.follow(self.ndjson):
+                    if not isinstance(entry.get('request'), dict):
+                        raise ValueError("Not a HAR entry at offset %d" % self.cursor)
+                    found.append((entry, bodies))
+                    self.cursor = end
+                    if limit is not None and len(found) >= limit:
+                        return found
+            except TruncatedHarError:
+                pass  # the rest is still being written
+            self.closed = reader.closed
+        self.size = size
+        return found
+
+    def _start(self, f):
+        # Detects the format and sets the cursor to the first entry;
+        # False if the file doesn't have that much yet
+        head = f.read(self.HEAD_SIZE)
+        if self.path.lower().endswith(self.NDJSON_SUFFIXES):
+            ndjson = True
+        else:
+            m = self.FIRST_KEY.match(head)
+            if m is None:
+                if len(head) < self.HEAD_SIZE:
+                    return False
+                raise ValueError("Not a HAR or NDJSON file: %s" % self.path)
+            ndjson = m.group(1) != b'log'
+        f.seek(0)
+        if ndjson:
+            cursor = 3 if head.startswith(b'\xef\xbb\xbf') else 0
+        else:
+            try:
+                cursor = HarStreamReader(f).entries_start()
+            except TruncatedHarError:
+                return False
+            if cursor is None:
+                raise ValueError("No log.entries in HAR file: %s" % self.path)
+        self.ndjson = ndjson
+        self.cursor = cursor
+        return True
+
+# Returns the body store for a loaded HAR: direct reads for plain files,
+# sequential re-reading of the decompressed stream for compressed ones
+def open_body_store(path):
+    if har_format(path) == 'json':
+        return FileBodyStore(path)
+    return StreamBodyStore(path)
+
+# Reads the bodies in `spans` (as from HarStreamReader or HarBodyIndex)
+# from a body store as (data, escaped, truncated), or None where there is
+# no body. Bodies longer than `limit` HAR bytes are only read that far.
+def read_bodies(store, spans, limit=None):
+    bodies = []
+    for span in spans:
+        if span is None or span[0] < 0:
+            bodies.append(None)
+            continue
+        offset, length, escaped = span
+        if limit is not None and length > limit:
+            bodies.append((store.read(offset, limit), escaped, True))
+        else:
+            bodies.append((store.read(offset, length), escaped, False))
+    return bodies
+
+# Reads bodies on demand from a plain HAR file.
+# Reads seek on one shared handle under a lock, so they are safe to call
+# from several threads.
+class FileBodyStore(object):
+    def __init__(self, path):
+        self._f = open(path, 'rb')
+        self._lock = threading.Lock()
+
+    def read(self, offset, length):
+        # Returns `length` bytes from `offset`
+        with self._lock:
+            self._f.seek(offset)
+            data = self._f.read(length)
+        if len(data) != length:
+            raise ValueError("Body at offset %d is past the end of the HAR" % offset)
+        return data
+
+    def close(self):
+        self._f.close()
+
+# Reads bodies from a compressed HAR by decompressing it again.
+# Compressed streams can't be mapped or seeked cheaply, so reads are
+# served going forward through the stream and a read before the current
+# position reopens it. Imports read bodies in entry order, so a full
+# import decompresses the file once.
+class StreamBodyStore(object):
+    SKIP_CHUNK = 1024 * 1024
+
+    def __init__(self, path):
+        self._path = path
+        self._f = None
+        self._pos = 0
+        self._lock = threading.Lock()
+
+    def read(self, offset, length):
+        # Returns `length` bytes from `offset`
+        with self._lock:
+            if self._f is None or offset < self._pos:
+                self.close()
+                self._f = open_har(self._path)
+                self._pos = 0
+            while self._pos < offset:
+                skipped = len(self._f.read(min(self.SKIP_CHUNK, offset - self._pos)))
+                if not skipped:
+                    raise ValueError("Body offset %d is past the end of the HAR" % offset)
+                self._pos += skipped
+            parts = []
+            remaining = length
+            while remaining > 0:
+                part = self._f.read(remaining)
+                if not part:
+                    raise ValueError("Body at offset %d is past the end of the HAR" % offset)
+                parts.append(part)
+                remaining -= len(part)
+            self._pos += length
+        return b''.join(parts)
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+# Persistent cache of parsed HAR indexes, so reopening a HAR skips parsing.
+# One sidecar file per HAR path in the cache directory, holding a small
+# header (format version and file identity) followed by the row index,
+# compact entries (see compact_entry) and body index. A cache file is only
+# used when the HAR's size, mtime and a hash of sampled blocks all still
+# match. The directory is kept under MAX_BYTES by evicting the least
+# recently used files.
+class HarIndexCache(object):
+    VERSION = 5
+    MAX_BYTES = 1024 * 1024 * 1024
+    SAMPLE_SIZE = 64 * 1024
+    SUFFIX = '.idx'
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or os.path.join(os.path.expanduser('~'), '.harbringer', 'cache')
+        self.max_bytes = max_bytes or self.MAX_BYTES
+
+    def load(self, path, key=None):
+        # Returns (rows, entries, bodies), or None on a miss. `key` is what
+        # else the index depends on, e.g. the import rules.
+        cache_path = self.cache_path(path)
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            with open(cache_path, 'rb') as f:
+                header = pickle.load(f)
+                if header != (self.VERSION, self.identity(path), key):
+                    return None
+                rows, entries, bodies = pickle.load(f)
+        except Exception:
+            return None
+        os.utime(cache_path, None)  # mark as recently used
+        return rows, entries, bodies
+
+    def save(self, path, rows, entries, bodies, key=None):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        cache_path = self.cache_path(path)
+        temp_path = cache_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump((self.VERSION, self.identity(path), key), f, 2)
+            pickle.dump((rows, entries, bodies), f, 2)
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+        os.rename(temp_path, cache_path)
+        self.evict()
+
+    def cache_path(self, path):
+        name = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, name + self.SUFFIX)
+
+    def identity(self, path):
+        return file_identity(path, self.SAMPLE_SIZE)
+
+    def evict(self):
+        files = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if name.endswith(self.SUFFIX):
+                cache_path = os.path.join(self.directory, name)
+                stat = os.stat(cache_path)
+                files.append((stat.st_mtime, stat.st_size, cache_path))
+                total += stat.st_size
+        files.sort()
+        while files and total > self.max_bytes:
+            mtime, size, cache_path = files.pop(0)
+            os.remove(cache_path)
+            total -= size
+
+# Identifies a file by path, size, mtime and a hash of its first, middle
+# and last blocks
+def file_identity(path, sample_size=64 * 1024):
+    stat = os.stat(path)
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for offset in (0, stat.st_size // 2, stat.st_size - sample_size):
+            f.seek(max(offset, 0))
+            digest.update(f.read(sample_size))
+    return os.path.abspath(path), stat.st_size, int(stat.st_mtime), digest.hexdigest()
+
+# Which entries of one HAR file have been added to the site map, one bit
+# per entry index, and the last one committed
+class ImportCheckpoint(object):
+    BITS = [bin(b).count('1') for b in range(256)]  # set bits per byte value
+
+    def __init__(self, entries=0):
+        self.done = bytearray((entries + 7) // 8)
+        self.last = -1
+
+    def __contains__(self, index):
+        byte = index >> 3
+        return byte < len(self.done) and bool(self.done[byte] & (1 << (index & 7)))
+
+    def add(self, index):
+        byte = index >> 3
+        if byte >= len(self.done):
+            self.done.extend(bytearray(byte + 1 - len(self.done)))
+        self.done[byte] |= 1 << (index & 7)
+        self.last = index
+
+    def count(self):
+        return sum(self.BITS[b] for b in self.done)
+
+# Sorted set of 64-bit digests in one flat array. New digests wait in a
+# small set and are merged in batches, so a lookup is a set probe plus a
+# binary search and a million digests take 8MB.
+class DigestSet(object):
+    TYPECODE = 'l' if array('l').itemsize >= 8 else 'q'
+    MERGE_SIZE = 65536
+
+    def __init__(self, values=()):
+        self._sorted = array(self.TYPECODE, sorted(set(values)))
+        self._recent = set()
+
+    def __len__(self):
+        return len(self._sorted) + len(self._recent)
+
+    def __contains__(self, value):
+        if value in self._recent:
+            return True
+        values = self._sorted
+        i = bisect_left(values, value)
+        return i < len(values) and values[i] == value
+
+    def add(self, value):
+        # Returns True if the value is new
+        if value in self:
+            return False
+        self._recent.add(value)
+        if len(self._recent) >= self.MERGE_SIZE:
+            self.merge()
+        return True
+
+    def merge(self):
+        if self._recent:
+            self._sorted = array(self.TYPECODE, sorted(chain(self._sorted, self._recent)))
+            self._recent = set()
+
+# Remembers what has been imported to the site map, so an import that was
+# cancelled or cut short by closing Burp can be resumed, and a file imported
+# again doesn't add the same entries twice.
+# There is one checkpoint per HAR file in ~/.harbringer/checkpoints, valid
+# while the file and the import rules (which decide the entry indexes) are
+# unchanged, and one shared log of the pair_digest of every request/response
+# pair imported, which also covers changed and overlapping files. The log
+# is only ever appended to.
+class CheckpointStore(object):
+    VERSION = 1
+    SUFFIX = '.ckpt'
+    LOG_NAME = 'imported.digests'
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.path.join(os.path.expanduser('~'), '.harbringer', 'checkpoints')
+        self._imported = None
+        self._pending = array(DigestSet.TYPECODE)
+        self._lock = threading.Lock()
+
+    def load(self, path, key=None):
+        # Returns the ImportCheckpoint of `path`, or None if there is none
+        # or it is out of date. `key` is what the entry indexes depend on.
+        checkpoint_path = self.checkpoint_path(path)
+        if not os.path.exists(checkpoint_path):
+            return None
+        try:
+            with open(checkpoint_path, 'rb') as f:
+                header = pickle.load(f)
+                if header != (self.VERSION, file_identity(path), key):
+                    return None
+                checkpoint = ImportCheckpoint()
+                checkpoint.done, checkpoint.last = pickle.load(f)
+        except Exception:
+            return None
+        return checkpoint
+
+    def save(self, path, checkpoint, key=None):
+        # Writes the checkpoint and appends newly imported digests to the log
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        checkpoint_path = self.checkpoint_path(path)
+        temp_path = checkpoint_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump((self.VERSION, file_identity(path), key), f, 2)
+            pickle.dump((bytearray(checkpoint.done), checkpoint.last), f, 2)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        os.rename(temp_path, checkpoint_path)
+        self.flush()
+
+    def checkpoint_path(self, path):
+        name = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, name + self.SUFFIX)
+
+    def imported(self):
+        # DigestSet of every pair imported so far, read on first use
+        with self._lock:
+            if self._imported is None:
+                values = array(DigestSet.TYPECODE)
+                log_path = os.path.join(self.directory, self.LOG_NAME)
+                if os.path.exists(log_path):
+                    with open(log_path, 'rb') as f:
+                        data = f.read()
+                    # a write cut short leaves a partial digest at the end
+                    data = data[:len(data) - len(data) % values.itemsize]
+                    if hasattr(values, 'frombytes'):
+                        values.frombytes(data)
+                    else:
+                        values.fromstring(data)
+                self._imported = DigestSet(values)
+            return self._imported
+
+    def record(self, digest):
+        # Adds a pair_digest to the log; returns False if it was already there
+        if not self.imported().add(digest):
+            return False
+        with self._lock:
+            self._pending.append(digest)
+        return True
+
+    def flush(self):
+        with self._lock:
+            pending = self._pending
+            if not pending:
+                return
+            self._pending = array(DigestSet.TYPECODE)
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        with open(os.path.join(self.directory, self.LOG_NAME), 'ab') as f:
+            pending.tofile(f)
+
+    def clear(self):
+        # Forgets all checkpoints and imported digests
+        with self._lock:
+            self._imported = DigestSet()
+            self._pending = array(DigestSet.TYPECODE)
+            if not os.path.isdir(self.directory):
+                return
+            for name in os.listdir(self.directory):
+                if name.endswith(self.SUFFIX) or name == self.LOG_NAME:
+                    os.remove(os.path.join(self.directory, name))
+
+# SHA-1 of a byte string, as a string usable as a dict key
+def digest(data):
+    return base64.b64encode(hashlib.sha1(data).digest()).decode('ascii')
+
+# 64-bit digest of the pair key returned by MessageBuilder.build, stable
+# across runs and Python implementations
+def pair_digest(key):
+    text = "\n".join("%s" % part for part in key)
+    return struct.unpack('<q', hashlib.sha1(text.encode('utf-8')).digest()[:8])[0]
+
+# Shared, bounded pool of the strings that repeat across entries: header
+# names, common header values such as User-Agent, MIME types. Each is kept
+# once instead of once per entry. Values longer than max_length (cookies,
+# tokens) are rarely shared and are used as they are, as is everything
+# once the pool holds max_strings values. Small tuples of pooled strings
+# can be interned the same way.
+class StringPool(object):
+    __slots__ = ('maxStrings', 'maxLength', '_strings')
+
+    MAX_STRINGS = 65536
+    MAX_LENGTH = 256
+
+    def __init__(self, max_strings=None, max_length=None):
+        self.maxStrings = max_strings or self.MAX_STRINGS
+        self.maxLength = max_length or self.MAX_LENGTH
+        self._strings = {}
+
+    def __len__(self):
+        return len(self._strings)
+
+    def intern(self, value):
+        if len(value) > self.maxLength:
+            return value
+        strings = self._strings
+        found = strings.get(value)
+        if found is not None:
+            return found
+        if len(strings) >= self.maxStrings:
+            return value
+        return strings.setdefault(value, value)
+
+# The part of a HAR entry MessageBuilder needs, as one flat tuple:
+#   (url, method, request headers, request body, status, status text,
+#    response headers, response body)
+# Headers are a flat (name, value, name, value, ...) tuple and bodies a
+# (mimeType, text, encoding) tuple; text is empty for bodies left in the
+# file by HarStreamReader. The status is an int (see to_int), also when the
+# HAR has it as a string or float. Everything else in the entry (timings,
+# cookies, query string, cache) is dropped. With a StringPool the strings
+# and empty bodies are shared between entries.
+def compact_entry(entry, strings=None):
+    request = entry.get('request', {})
+    response = entry.get('response', {})
+    return (request.get('url', ''),
+            pooled(request.get('method', 'GET'), strings),
+            compact_headers(request.get('headers', []), strings),
+            compact_body(request.get('postData', {}), strings),
+            to_int(response.get('status', 200), 'i'),
+            pooled(response.get('statusText', 'OK'), strings),
+            compact_headers(response.get('headers', []), strings),
+            compact_body(response.get('content', {}), strings))
+
+def compact_headers(headers, strings=None):
+    values = []
+    for h in headers:
+        values.append(pooled(h.get('name', ''), strings))
+        values.append(pooled(h.get('value', ''), strings))
+    return tuple(values)
+
+def compact_body(container, strings=None):
+    body = (pooled(container.get('mimeType', ''), strings), container.get('text'),
+            pooled(container.get('encoding'), strings))
+    if strings is None or body[1]:
+        return body
+    return strings.intern(body)
+
+def pooled(value, strings):
+    if strings is None or not isinstance(value, string_types):
+        return value
+    return strings.intern(value)
+
+# Builds the raw request and response bytes for a HAR entry.
+# The request/status line and headers are encoded once as a single block and
+# the body is decoded straight to bytes (base64) or encoded with its declared
+# charset (text), then both are joined into one message. Bodies never go
+# through a Python string or a charset round trip when they don't need
+# to, so binary content is kept byte for byte.
+# The byte-level operations (parse_url down to digest) work on Python byte
+# strings; the Burp extension overrides them to produce Java byte[]s.
+class MessageBuilder(object):
+    HEAD_CHARSET = 'ISO-8859-1'
+    # An escape sequence cut off at the end of a truncated JSON string
+    PARTIAL_ESCAPE = re.compile(r'(?<!\\)((?:\\\\)*)\\(?:u[0-9a-fA-F]{0,3})?\Z')
+    NON_BASE64 = re.compile(b'[^A-Za-z0-9+/]')
+
+    def __init__(self, max_body_size=None):
+        self.maxBodySize = max_body_size  # bodies are truncated to this many bytes
+        self.stats = None  # StageStats timing the decode and encode stages
+
+    def build(self, entry, raw_bodies=(None, None), cache=None):
+        # Returns (host, port, protocol, request_bytes, response_bytes, key).
+        # `entry` is a compact_entry() tuple, or a HAR entry dict which is
+        # compacted first. raw_bodies holds the request/response body as
+        # read from the HAR file (see read_bodies); None means use the
+        # entry's own text. With a ContentCache, identical bodies are
+        # decoded once and identical messages share one value; key then
+        # identifies the request/response pair by content (None without a
+        # cache).
+        if isinstance(entry, dict):
+            entry = compact_entry(entry)
+        url, method, request_headers, post_data, status, status_text, response_headers, content = entry
+
+        protocol, host, port, path = self.parse_url(url)
+
+        request_head = self.head("%s %s HTTP/1.1" % (method, path), request_headers, host)
+        request_bytes, request_key = self.message(request_head, post_data, raw_bodies[0], cache)
+
+        response_head = self.head("HTTP/1.1 %d %s" % (status, status_text), response_headers)
+        response_bytes, response_key = self.message(response_head, content, raw_bodies[1], cache)
+
+        key = None
+        if cache is not None:
+            key = (protocol, host, port, request_key, response_key)
+        return host, port, protocol, request_bytes, response_bytes, key
+
+    def message(self, head, container, raw, cache):
+        # head + body as one message, plus its content key when caching
+        if cache is None:
+            return self.join(head, self.decoded_body(container, raw)), None
+        head_key = self.digest(head)
+        body_key = self.body_key(container, raw)
+        if body_key is None:
+            return head, head_key
+
+        def build_body():
+            return self.decoded_body(container, raw)
+
+        def build_message():
+            return self.join(head, cache.bodies.lookup(body_key, build_body))
+
+        message_key = head_key + body_key
+        return cache.messages.lookup(message_key, build_message), message_key
+
+    def body_key(self, container, raw):
+        # Identifies a body by its encoded form and how it will be decoded
+        mime_type, text, encoding = container
+        if raw is not None:
+            data = raw[0]
+        else:
+            if not text:
+                return None
+            data = self.encode(text, 'UTF-8')
+        return "%s:%s:%s" % (self.digest(data), encoding or '', self.charset_from_mime(mime_type))
+
+    def head(self, first_line, headers, host=None):
+        # First line and flat (name, value, ...) headers as one block,
+        # ending with the blank line. A Host header is added for requests
+        # that don't carry one.
+        lines = [first_line]
+        has_host = host is None
+        for i in range(0, len(headers), 2):
+            name = headers[i]
+            if not has_host and name.lower() == 'host':
+                has_host = True
+            lines.append("%s: %s" % (name, headers[i + 1]))
+        if not has_host:
+            lines.insert(1, "Host: %s" % host)
+        lines.append("\r\n")
+        if self.stats is None:
+            return self.encode("\r\n".join(lines), self.HEAD_CHARSET)
+        started = time.time()
+        data = self.encode("\r\n".join(lines), self.HEAD_CHARSET)
+        self.stats.add('encode', time.time() - started, len(data))
+        return data
+
+    def decoded_body(self, container, raw):
+        # The truncated body, timed as the decode stage
+        if self.stats is None:
+            return self.truncate(self.body(container, raw))
+        started = time.time()
+        body = self.truncate(self.body(container, raw))
+        self.stats.add('decode', time.time() - started, len(body) if body is not None else 0)
+        return body
+
+    def body(self, container, raw=None):
+        # A (mimeType, text, encoding) body as bytes, or None when there is
+        # no body
+        if raw is not None:
+            return self.raw_body(container, raw)
+        mime_type, text, encoding = container
+        if not text:
+            return None
+        if encoding == 'base64':
+            return self.decode_base64(text)
+        return self.encode(text, self.charset_from_mime(mime_type))
+
+    def raw_body(self, container, raw):
+        # `raw` is (bytes, escaped, truncated): the body's JSON string
+        # contents, UTF-8 encoded as stored in the HAR file, possibly cut
+        # short by raw_limit. Without escape sequences it is used as is:
+        # base64 is decoded directly and UTF-8 text needs no conversion.
+        mime_type, encoding = container[0], container[2]
+        data, escaped, truncated = raw
+        if truncated:
+            return self.truncated_body(container, data, escaped)
+        if escaped:
+            text = json.loads(u'"%s"' % self.decode_text(data))
+            return self.body((mime_type, text, encoding))
+        if encoding == 'base64':
+            return self.decode_base64(data)
+        charset = self.charset_from_mime(mime_type)
+        if self.is_utf8(charset):
+            return data
+        return self.encode(self.decode_text(data), charset)
+
+    def raw_limit(self):
+        # Most HAR bytes read for a body when truncating, or None. Base64
+        # takes 4/3 of the decoded size and escaped text up to 6 bytes per
+        # character; twice the limit covers all but heavily escaped text,
+        # which then comes out shorter than maxBodySize.
+        if self.maxBodySize is None:
+            return None
+        return self.maxBodySize * 2 + 8
+
+    def truncated_body(self, container, data, escaped):
+        # The start of a body read up to raw_limit: any escape sequence or
+        # base64 quantum cut in half at the end is dropped before decoding
+        mime_type, encoding = container[0], container[2]
+        text = self.decode_text(data)
+        if escaped:
+            text = json.loads(u'"%s"' % self.PARTIAL_ESCAPE.sub(r'\1', text))
+        if encoding == 'base64':
+            text = re.sub(r'[^A-Za-z0-9+/]', '', text)
+            return self.decode_base64(text[:len(text) // 4 * 4])
+        return self.encode(text, self.charset_from_mime(mime_type))
+
+    def charset_from_mime(self, mime_type, default='UTF-8'):
+        # Returns the charset named in a MIME type, or `default`
+        if mime_type and 'charset=' in mime_type:
+            charset = mime_type.split('charset=')[1].split(';')[0].strip().strip('"\'')
+            if charset and self.charset_supported(charset):
+                return charset
+        return default
+
+    def parse_url(self, url):
+        # (protocol, host, port, path with query) of an absolute URL, with
+        # the protocol's default port when none is given
+        parts = urlsplit(url)
+        protocol = parts.scheme
+        host = parts.netloc.rpartition('@')[2]
+        if host.startswith('['):
+            host = host[:host.index(']') + 1]
+        else:
+            host = host.partition(':')[0]
+        port = parts.port
+        if port is None:
+            port = 443 if protocol.lower() == 'https' else 80
+        path = parts.path
+        if parts.query:
+            path = path + "?" + parts.query
+        return protocol, host, port, path
+
+    def charset_supported(self, charset):
+        try:
+            codecs.lookup(charset)
+            return True
+        except LookupError:
+            return False
+
+    def is_utf8(self, charset):
+        return codecs.lookup(charset).name == 'utf-8'
+
+    def encode(self, text, charset):
+        return text.encode(charset, 'replace')
+
+    def decode_text(self, data):
+        # UTF-8 bytes to text, replacing malformed sequences
+        return data.decode('utf-8', 'replace')
+
+    def decode_base64(self, data):
+        # Like a MIME decoder: characters outside the base64 alphabet are
+        # skipped and missing padding is allowed
+        if not isinstance(data, bytes):
+            data = data.encode('ascii', 'ignore')
+        data = self.NON_BASE64.sub(b'', data)
+        if len(data) % 4 == 1:
+            data = data[:-1]
+        return base64.b64decode(data + b'=' * (-len(data) % 4))
+
+    def truncate(self, body):
+        if body is None or self.maxBodySize is None or len(body) <= self.maxBodySize:
+            return body
+        return body[:self.maxBodySize]
+
+    def join(self, head, body):
+        if body is None or len(body) == 0:
+            return head
+        return head + body
+
+    def digest(self, data):
+        return digest(data)
+
+# Bounded, content-addressed store of byte strings shared during an import.
+# Values are looked up by a content digest and built by `factory` only on
+# a miss; the least recently used values are evicted once the total size
+# goes over max_bytes. Safe to use from the import pool threads.
+class ContentStore(object):
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.bytesSaved = 0
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key, factory):
+        with self._lock:
+            value = self._values.pop(key, None)
+            if value is not None:
+                self._values[key] = value
+                self.hits += 1
+                self.bytesSaved += len(value)
+                return value
+        value = factory()
+        if value is None:
+            return None
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = value
+                self.size += len(value)
+                while self.size > self.max_bytes and self._values:
+                    evicted_key, evicted = self._values.popitem(False)
+                    self.size -= len(evicted)
+        return value
+
+# Content-addressed caches used by one import: decoded bodies, and built
+# messages so identical requests/responses share the same bytes
+class ContentCache(object):
+    MAX_BODY_BYTES = 128 * 1024 * 1024
+    MAX_MESSAGE_BYTES = 128 * 1024 * 1024
+
+    def __init__(self):
+        self.bodies = ContentStore(self.MAX_BODY_BYTES)
+        self.messages = ContentStore(self.MAX_MESSAGE_BYTES)
+
+    def bytes_saved(self):
+        return self.bodies.bytesSaved + self.messages.bytesSaved
+
+# Exclusive bound on the magnitude of values in an array of each typecode
+ARRAY_LIMITS = dict((typecode, 1 << (8 * array(typecode).itemsize - 1)) for typecode in 'il')
+
+# `value` as an int that fits an array of `typecode`, for HAR numbers
+# that some tools write as strings ("200") or floats (1.0). Returns
+# `default` for anything else (missing, non-numeric, NaN, out of range).
+def to_int(value, typecode, default=0):
+    try:
+        try:
+            value = int(value)
+        except ValueError:
+            value = int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return default
+    limit = ARRAY_LIMITS[typecode]
+    if not -limit <= value < limit:
+        return default
+    return value
+
+# Compact, column-oriented store of the values shown in the table.
+# Built once while the HAR is loaded; each cell is a single array or list
+# read, and the table never touches the parsed entries. Methods and MIME
+# types repeat heavily, so they are interned to share one string each.
+class HarRowIndex(object):
+    __slots__ = ('methods', 'urls', 'statuses', 'sizes', 'mimeTypes', 'search', '_strings')
+
+    def __init__(self):
+        self.methods = []
+        self.urls = []
+        self.statuses = array('i')
+        self.sizes = array('l')
+        self.mimeTypes = []
+        self.search = HarSearchIndex()
+        self._strings = {}
+
+    def __len__(self):
+        # mimeTypes is appended last, so a row counts once it is complete
+        return len(self.mimeTypes)
+
+    def intern(self, value):
+        return self._strings.setdefault(value, value)
+
+    def add(self, entry):
+        request = entry.get('request', {})
+        response = entry.get('response', {})
+        content = response.get('content', {})
+        self.add_row(request.get('method', ''), request.get('url', ''), response.get('status', 0),
+                     content.get('size', 0), content.get('mimeType', ''))
+
+    def add_row(self, method, url, status, size, mime_type):
+        # HAR writers may leave out or null any of these
+        status = to_int(status, 'i')
+        size = to_int(size, 'l')
+        method = self.intern(method or '')
+        url = url or ''
+        mime_type = self.intern(mime_type or '')
+        self.search.add(len(self.mimeTypes), method, url, status, mime_type)
+        self.methods.append(method)
+        self.urls.append(url)
+        self.statuses.append(status)
+        self.sizes.append(size)
+        self.mimeTypes.append(mime_type)
+
+    def extend(self, other):
+        # Appends all rows of another HarRowIndex, reusing its search index.
+        # mimeTypes goes last since it is what makes the rows visible.
+        self.search.extend(other.search, len(self))
+        self.methods.extend([self.intern(value) for value in other.methods])
+        self.urls.extend(other.urls)
+        self.statuses.extend(other.statuses)
+        self.sizes.extend(other.sizes)
+        self.mimeTypes.extend([self.intern(value) for value in other.mimeTypes])
+
+    def __getstate__(self):
+        return self.methods, self.urls, list(self.statuses), list(self.sizes), self.mimeTypes, self.search
+
+    def __setstate__(self, state):
+        methods, self.urls, statuses, sizes, mimeTypes, self.search = state
+        self._strings = {}
+        self.methods = [self.intern(value) for value in methods]
+        self.statuses = array('i', statuses)
+        self.sizes = array('l', sizes)
+        self.mimeTypes = [self.intern(value) for value in mimeTypes]
+
+# Splits an absolute URL into its lower-cased host (without credentials or
+# port) and its path (without query or fragment)
+def split_url(url):
+    rest = url.split('://', 1)[-1]
+    end = len(rest)
+    for c in '/?#':
+        i = rest.find(c)
+        if 0 <= i < end:
+            end = i
+    host = rest[:end].rsplit('@', 1)[-1]
+    if host.startswith('['):
+        host = host[:host.find(']') + 1]
+    else:
+        host = host.split(':', 1)[0]
+    path = rest[end:].split('?', 1)[0].split('#', 1)[0] or '/'
+    return host.lower(), path
+
+# The distinct 3-character substrings of `text`
+def trigrams(text):
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+# Inverted indexes over the table rows, used by the filter bar.
+# Built alongside HarRowIndex while the HAR loads. Hosts, lower-cased
+# paths, methods and MIME types get a small integer id each, stored per
+# row, with a posting list (array of row numbers in load order) per id
+# and per status code. Substring search on paths uses a trigram index
+# over the distinct paths, so only paths sharing every trigram of the
+# query are compared.
+class HarSearchIndex(object):
+    FIELDS = ('host', 'path', 'method', 'mime')
+
+    __slots__ = ('values', 'rowIds', 'postings', 'statusRows', 'trigrams', '_ids')
+
+    def __init__(self):
+        self.values = dict((field, []) for field in self.FIELDS)  # id -> value
+        self.rowIds = dict((field, array('i')) for field in self.FIELDS)  # row -> id
+        self.postings = dict((field, []) for field in self.FIELDS)  # id -> rows
+        self.statusRows = {}
+        self.trigrams = {}  # trigram -> path ids
+        self._ids = dict((field, {}) for field in self.FIELDS)  # value -> id
+
+    def add(self, row, method, url, status, mime_type):
+        host, path = split_url(url or '')
+        for field, value in (('host', host), ('path', path.lower()), ('method', (method or '').upper()),
+                             ('mime', (mime_type or '').lower())):
+            value_id = self.value_id(field, value)
+            self.postings[field][value_id].append(row)
+            self.rowIds[field].append(value_id)
+        rows = self.statusRows.get(status)
+        if rows is None:
+            rows = self.statusRows[status] = array('i')
+        rows.append(row)
+
+    def value_id(self, field, value):
+        ids = self._ids[field]
+        value_id = ids.get(value)
+        if value_id is None:
+            value_id = ids[value] = len(self.values[field])
+            self.values[field].append(value)
+            self.postings[field].append(array('i'))
+            if field == 'path':
+                for gram in trigrams(value):
+                    self.trigrams.setdefault(gram, array('i')).append(value_id)
+        return value_id
+
+    def extend(self, other, offset):
+        # Appends the rows of another HarSearchIndex, numbered from `offset`.
+        # Its value ids are mapped onto this index's ids, so no URL is split
+        # again and only values new to this index get trigrams.
+        for field in self.FIELDS:
+            ids = [self.value_id(field, value) for value in other.values[field]]
+            postings = self.postings[field]
+            for value_id, rows in zip(ids, other.postings[field]):
+                postings[value_id].extend(array('i', [row + offset for row in rows]))
+            self.rowIds[field].extend(array('i', imap(ids.__getitem__, other.rowIds[field])))
+        for status, rows in other.statusRows.items():
+            mine = self.statusRows.get(status)
+            if mine is None:
+                mine = self.statusRows[status] = array('i')
+            mine.extend(array('i', [row + offset for row in rows]))
+
+    def path_candidates(self, query, limit=None):
+        # Ids of the paths that may contain `query` (lower-cased), or None
+        # when even its rarest trigram is in more than `limit` paths
+        grams = trigrams(query)
+        if not grams:
+            return range(len(self.values['path'])) if limit is None else None
+        postings = sorted((self.trigrams.get(gram, ()) for gram in grams), key=len)
+        if limit is not None and len(postings[0]) > limit:
+            return None
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(posting)
+        return candidates
+
+    def __getstate__(self):
+        return (dict((field, list(ids)) for field, ids in self.rowIds.items()),
+                self.values,
+                dict((field, [list(rows) for rows in postings]) for field, postings in self.postings.items()),
+                dict((status, list(rows)) for status, rows in self.statusRows.items()),
+                dict((gram, list(ids)) for gram, ids in self.trigrams.items()))
+
+    def __setstate__(self, state):
+        row_ids, self.values, postings, status_rows, grams = state
+        self.rowIds = dict((field, array('i', ids)) for field, ids in row_ids.items())
+        self.postings = dict((field, [array('i', rows) for rows in lists]) for field, lists in postings.items())
+        self.statusRows = dict((status, array('i', rows)) for status, rows in status_rows.items())
+        self.trigrams = dict((gram, array('i', ids)) for gram, ids in grams.items())
+        self._ids = dict((field, dict((value, i) for i, value in enumerate(values)))
+                         for field, values in self.values.items())
+
+# Parses a number such as "512", "1.5k" or "2m"; k/m/g multiply by 1024.
+# Returns `default` for an empty string and raises ValueError if invalid.
+def parse_size(text, default=None):
+    value = text.strip().lower()
+    if not value:
+        return default
+    multiplier = 1
+    if value[-1] in 'kmg':
+        multiplier = 1024 ** ('kmg'.index(value[-1]) + 1)
+        value = value[:-1]
+    try:
+        return int(float(value) * multiplier)
+    except OverflowError:
+        raise ValueError("Invalid size: %s" % text.strip())
+
+# Parses a filter range such as "404", "200-299", "400-", "-100", ">=1k"
+# or "<2m" into an inclusive (low, high) pair, with parse_size numbers.
+# Returns None for an empty string and raises ValueError if invalid.
+def parse_range(text):
+    text = text.strip().lower().replace(' ', '')
+    if not text:
+        return None
+
+    low, high = None, None
+    if text.startswith('>='):
+        low = parse_size(text[2:])
+    elif text.startswith('>'):
+        low = parse_size(text[1:])
+        low = low + 1 if low is not None else None
+    elif text.startswith('<='):
+        high = parse_size(text[2:])
+    elif text.startswith('<'):
+        high = parse_size(text[1:])
+        high = high - 1 if high is not None else None
+    elif '-' in text:
+        i = text.index('-')
+        low, high = parse_size(text[:i]), parse_size(text[i + 1:])
+    else:
+        low = high = parse_size(text)
+    if low is None and high is None:
+        raise ValueError("Invalid range: %s" % text)
+    return (low if low is not None else -sys.maxsize - 1,
+            high if high is not None else sys.maxsize)
+
+# A filter-bar query over HarRowIndex rows.
+# host, path and mime match as case-insensitive substrings, method
+# exactly; status and size are (low, high) ranges. select() turns each
+# criterion into a test over one column (a table of matching value ids,
+# or a range check) and runs the tests with C-level iterators, narrowest
+# first; matches() checks a single row, e.g. one published after the
+# filter was applied.
+class HarFilter(object):
+    # The narrowest criterion supplies the candidate rows from its posting
+    # lists if it has only one or allows at most 1/SCAN_FRACTION of the
+    # rows; otherwise every row is scanned
+    SCAN_FRACTION = 2
+
+    def __init__(self, host='', path='', method='', mime='', status=None, size=None):
+        self.host = host.strip().lower()
+        self.path = path.strip().lower()
+        self.method = method.strip().upper()
+        self.mime = mime.strip().lower()
+        self.status = status
+        self.size = size
+        # Per field: value id -> whether that value matches
+        self._matches = dict((field, {}) for field in HarSearchIndex.FIELDS)
+
+    def is_empty(self):
+        return not (self.host or self.path or self.method or self.mime or self.status or self.size)
+
+    def _value_matches(self, search, field, value_id):
+        cache = self._matches[field]
+        matched = cache.get(value_id)
+        if matched is None:
+            value = search.values[field][value_id]
+            if field == 'host':
+                matched = self.host in value
+            elif field == 'path':
+                matched = self.path in value
+            elif field == 'method':
+                matched = self.method == value
+            else:
+                matched = self.mime in value
+            cache[value_id] = matched
+        return matched
+
+    def _criteria(self):
+        return [(field, query) for field, query in (('host', self.host), ('path', self.path),
+                                                    ('method', self.method), ('mime', self.mime)) if query]
+
+    def matches(self, rows, row):
+        search = rows.search
+        for field, query in self._criteria():
+            if not self._value_matches(search, field, search.rowIds[field][row]):
+                return False
+        if self.status and not self.status[0] <= rows.statuses[row] <= self.status[1]:
+            return False
+        if self.size and not self.size[0] <= rows.sizes[row] <= self.size[1]:
+            return False
+        return True
+
+    def select(self, rows, count):
+        # Matching row numbers below `count`, in load order
+        search = rows.search
+        criteria = []  # (rows allowed, their posting lists or None, column, test)
+        for field, query in self._criteria():
+            allowed = self._allowed_ids(search, field, query)
+            if not any(allowed):
+                return array('i')
+            if all(allowed):
+                continue
+            postings = list(compress(search.postings[field], allowed))
+            criteria.append((sum(imap(len, postings)), postings, search.rowIds[field],
+                             lambda values, allowed=allowed: imap(allowed.__getitem__, values)))
+        if self.status:
+            low, high = self.status
+            allowed = dict((status, low <= status <= high) for status in search.statusRows)
+            postings = [search.statusRows[status] for status in allowed if allowed[status]]
+            if not postings:
+                return array('i')
+            criteria.append((sum(imap(len, postings)), postings, rows.statuses,
+                             lambda values, allowed=allowed: imap(allowed.__getitem__, values)))
+        if self.size:
+            criteria.append((count, None, rows.sizes, self._size_test))
+
+        if not criteria:
+            return array('i', range(count))
+        criteria.sort(key=lambda criterion: criterion[0])
+        allowed, postings, column, test = criteria[0]
+        candidates = None  # all rows
+        if postings is not None and (len(postings) == 1 or allowed * self.SCAN_FRACTION <= count):
+            if len(postings) == 1:
+                candidates = postings[0]
+            else:
+                candidates = sorted(chain.from_iterable(postings))
+            candidates = candidates[:bisect_left(candidates, count)]
+            criteria = criteria[1:]
+        for allowed, postings, column, test in criteria:
+            if candidates is None:
+                candidates = list(compress(range(count), test(column)))
+            else:
+                candidates = list(compress(candidates, test(imap(column.__getitem__, candidates))))
+            if not candidates:
+                break
+        return array('i', candidates)
+
+    def _allowed_ids(self, search, field, query):
+        # bytearray over the field's value ids, 1 where the value matches
+        values = search.values[field]
+        if field == 'path':
+            ids = search.path_candidates(query, len(values) // self.SCAN_FRACTION)
+            if ids is not None:
+                allowed = bytearray(len(values))
+                for i in ids:
+                    if query in values[i]:
+                        allowed[i] = 1
+                return allowed
+        if field == 'method':
+            return bytearray(imap(eq, values, repeat(query)))
+        return bytearray(imap(contains, values, repeat(query)))
+
+    def _size_test(self, values):
+        # low <= size <= high for each of `values`, as an iterator
+        low, high = self.size
+        if low <= -sys.maxsize - 1:
+            return imap(ge, repeat(high), values)
+        if high >= sys.maxsize:
+            return imap(le, repeat(low), values)
+        values = list(values)
+        return imap(and_, imap(le, repeat(low), values), imap(ge, repeat(high), values))
+
+# Include/exclude rules applied while a HAR file is loaded.
+# Host and MIME type patterns are comma-separated globs ("*.example.com",
+# "image/*") matched case-insensitively; an empty include list allows
+# everything. The rules are compiled once and checked against an entry's
+# metadata only, so excluded entries are dropped before their bodies are
+# read or kept. Bodies longer than maxBodySize are truncated when the
+# entry is built. `settings` holds the text of each rule, as edited in the
+# rules dialog and saved with the extension settings.
+class ImportRules(object):
+    DEFAULTS = (('includeHosts', ''), ('excludeHosts', ''), ('methods', ''), ('includeMimeTypes', ''),
+                ('excludeMimeTypes', ''), ('status', ''), ('maxBodySize', ''), ('inScopeOnly', False))
+
+    def __init__(self, settings=None, in_scope=None):
+        # Raises ValueError if a rule is invalid. in_scope(url) says whether
+        # a URL is in the target scope, for the inScopeOnly rule.
+        settings = settings or {}
+        self.settings = dict((name, settings.get(name, default)) for name, default in self.DEFAULTS)
+        self.includeHosts = self.globs(self.settings['includeHosts'])
+        self.excludeHosts = self.globs(self.settings['excludeHosts'])
+        self.methods = frozenset(self.split(self.settings['methods'].upper()))
+        self.includeMimeTypes = self.globs(self.settings['includeMimeTypes'])
+        self.excludeMimeTypes = self.globs(self.settings['excludeMimeTypes'])
+        self.status = parse_range(self.settings['status'])
+        self.maxBodySize = parse_size(self.settings['maxBodySize'])
+        if self.maxBodySize is not None and self.maxBodySize < 0:
+            raise ValueError("Invalid maximum body size: %s" % self.settings['maxBodySize'])
+        self.inScope = None
+        if self.settings['inScopeOnly'] and in_scope is not None:
+            self.inScope = in_scope
+        self._hosts = {}  # host -> allowed
+        self._mimeTypes = {}  # MIME type -> allowed
+
+    def split(self, text):
+        return [value for value in re.split(r'[,\s]+', text.strip()) if value]
+
+    def globs(self, text):
+        # One regex for all the patterns, or None if there are none
+        patterns = [re.escape(pattern.lower()).replace('\\*', '.*').replace('\\?', '.')
+                    for pattern in self.split(text)]
+        if not patterns:
+            return None
+        return re.compile('(?:%s)\\Z' % '|'.join(patterns))
+
+    def is_empty(self):
+        # True if no entry is excluded and no body truncated
+        return self.filters_nothing() and self.maxBodySize is None
+
+    def filters_nothing(self):
+        return not (self.includeHosts or self.excludeHosts or self.methods or self.includeMimeTypes
+                    or self.excludeMimeTypes or self.status or self.inScope)
+
+    def key(self):
+        # Identifies the rules for the index cache, or None when the result
+        # depends on Burp's scope and can't be cached
+        if self.inScope is not None:
+            return None
+        return tuple(sorted(self.settings.items()))
+
+    def _allowed(self, value, include, exclude):
+        if include is not None and not include.match(value):
+            return False
+        return exclude is None or not exclude.match(value)
+
+    def allows(self, entry):
+        # Checks the cheapest rules first; host and MIME type decisions are
+        # remembered as both repeat heavily
+        request = entry.get('request', {})
+        response = entry.get('response', {})
+        if self.methods and (request.get('method') or '').upper() not in self.methods:
+            return False
+        if self.status is not None and not self.status[0] <= to_int(response.get('status'), 'i') <= self.status[1]:
+            return False
+
+        mime_type = response.get('content', {}).get('mimeType', '') or ''
+        allowed = self._mimeTypes.get(mime_type)
+        if allowed is None:
+            allowed = self._allowed(mime_type.split(';')[0].strip().lower(),
+                                    self.includeMimeTypes, self.excludeMimeTypes)
+            self._mimeTypes[mime_type] = allowed
+        if not allowed:
+            return False
+
+        url = request.get('url', '')
+        host = split_url(url)[0]
+        allowed = self._hosts.get(host)
+        if allowed is None:
+            allowed = self._allowed(host, self.includeHosts, self.excludeHosts)
+            self._hosts[host] = allowed
+        if not allowed:
+            return False
+
+        if self.inScope is not None:
+            try:
+                return bool(self.inScope(url))
+            except Exception:
+                return False
+        return True
+
+# Counters and timers for the stages of a load or an import, plus error
+# counts by category. Each thread adds to its own table, so timing the hot
+# path takes no lock; snapshot() sums the tables for display or export.
+class StageStats(object):
+    # parse/index time the loader, the rest the import; build includes
+    # decode and encode
+    STAGES = ('parse', 'index', 'read', 'decode', 'encode', 'build', 'addToSiteMap')
+
+    def __init__(self):
+        self.started = time.time()
+        self.finished = None
+        self._local = threading.local()
+        self._tables = []
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds, size=0):
+        table = getattr(self._local, 'table', None)
+        if table is None:
+            table = self._local.table = {}
+            with self._lock:
+                self._tables.append(table)
+        totals = table.get(stage)
+        if totals is None:
+            totals = table[stage] = [0, 0.0, 0]
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] += size
+
+    def error(self, category):
+        with self._lock:
+            self._errors[category] = self._errors.get(category, 0) + 1
+
+    def finish(self):
+        self.finished = time.time()
+
+    def snapshot(self):
+        # {'elapsed': seconds, 'stages': {stage: {'calls', 'seconds',
+        # 'bytes'}}, 'errors': {category: count}}; JSON-serializable
+        with self._lock:
+            tables = list(self._tables)
+            errors = dict(self._errors)
+        stages = {}
+        for table in tables:
+            for stage, (calls, seconds, size) in list(table.items()):
+                totals = stages.setdefault(stage, {'calls': 0, 'seconds': 0.0, 'bytes': 0})
+                totals['calls'] += calls
+                totals['seconds'] += seconds
+                totals['bytes'] += size
+        return {
+            'elapsed': (self.finished or time.time()) - self.started,
+            'stages': stages,
+            'errors': errors,
+        }
+
+# Formats a StageStats snapshot as a text table
+def format_stats(snapshot):
+    lines = ["%-13s %10s %10s %10s %10s %10s" % ("stage", "calls", "seconds", "avg us", "bytes", "MB/s")]
+    stages = snapshot['stages']
+    for stage in StageStats.STAGES + tuple(sorted(set(stages) - set(StageStats.STAGES))):
+        totals = stages.get(stage)
+        if not totals:
+            continue
+        seconds = totals['seconds']
+        lines.append("%-13s %10d %10.2f %10.1f %10s %10s" % (
+            stage, totals['calls'], seconds, seconds * 1e6 / max(totals['calls'], 1),
+            format_size(totals['bytes']) if totals['bytes'] else "-",
+            "%.1f" % (totals['bytes'] / 1048576.0 / seconds) if totals['bytes'] and seconds > 0 else "-"))
+    lines.append("elapsed %.2fs" % snapshot['elapsed'])
+    if snapshot['errors']:
+        lines.append("errors: " + ", ".join("%s %d" % (category, count)
+                                            for category, count in sorted(snapshot['errors'].items())))
+    return "\n".join(lines)
+
+# Passes messages to `write` at most once every `interval` seconds, so
+# per-entry logging can't flood the output or slow a loop down. Messages
+# dropped in between are counted and noted on the next one written.
+class RateLimitedLog(object):
+    def __init__(self, write, interval=5.0):
+        self.write = write
+        self.interval = interval
+        self.suppressed = 0
+        self._next = 0.0
+
+    def log(self, message, force=False):
+        # Returns True if the message was written
+        now = time.time()
+        if not force and now < self._next:
+            self.suppressed += 1
+            return False
+        if self.suppressed:
+            message = "%s (%d similar messages not shown)" % (message, self.suppressed)
+            self.suppressed = 0
+        self._next = now + self.interval
+        self.write(message)
+        return True
+
+# Formats a byte count as B, KB, MB or GB
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return "%.0f %s" % (size, unit) if unit == "B" else "%.1f %s" % (size, unit)
+        size /= 1024.0
+    return "%.1f GB" % size
+
+# Formats a number of seconds as m:ss or h:mm:ss
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return "%d:%02d:%02d" % (seconds // 3600, seconds % 3600 // 60, seconds % 60)
+    return "%d:%02d" % (seconds // 60, seconds % 60)
+
+# Streams the raw messages of a HAR file without keeping its entries.
+# Yields (index, entry, host, port, protocol, request, response) for each
+# entry allowed by `rules` (an ImportRules), where index counts every
+# entry in the file; with shard=(i, n) only entries whose index is i
+# modulo n are built. Bodies are read through a second handle on the file
+# as each entry is built, so memory stays bounded by the largest entry.
+# With a StageStats, the parse, read and build stages are timed.
+# An entry whose body can't be read or whose message can't be built is
+# skipped and counted as a stage error, like in the extension, and
+# reported to errors(index, stage, exception) if given. Errors reading the
+# HAR file itself end the iteration.
+def iter_messages(path, rules=None, builder=None, shard=None, stats=None, errors=None):
+    if builder is None:
+        builder = MessageBuilder(rules.maxBodySize if rules is not None else None)
+    if rules is not None and rules.filters_nothing():
+        rules = None
+    limit = builder.raw_limit()
+    builder.stats = stats
+    store = open_body_store(path)
+    try:
+        with open_har(path) as f:
+            reader = HarStreamReader(f)
+            last = time.time()
+            position = 0
+            for index, (entry, spans) in enumerate(reader.entries()):
+                if stats is not None:
+                    now = time.time()
+                    stats.add('parse', now - last, reader.position() - position)
+                    position = reader.position()
+                if shard is not None and index % shard[1] != shard[0]:
+                    last = time.time()
+                    continue
+                if rules is not None and not rules.allows(entry):
+                    last = time.time()
+                    continue
+                stage = 'read'
+                try:
+                    if stats is None:
+                        raw_bodies = read_bodies(store, spans, limit)
+                        stage = 'build'
+                        message = builder.build(entry, raw_bodies)
+                    else:
+                        started = time.time()
+                        raw_bodies = read_bodies(store, spans, limit)
+                        read = time.time()
+                        stats.add('read', read - started,
+                                  sum(len(raw[0]) for raw in raw_bodies if raw is not None))
+                        stage = 'build'
+                        message = builder.build(entry, raw_bodies)
+                        stats.add('build', time.time() - read)
+                except Exception as e:
+                    if stats is not None:
+                        stats.error("%s (%s)" % (stage, type(e).__name__))
+                    if errors is not None:
+                        errors(index, stage, e)
+                    last = time.time()
+                    continue
+                host, port, protocol, request, response, key = message
+                yield index, entry, host, port, protocol, request, response
+                last = time.time()
+    finally:
+        builder.stats = None
+        if stats is not None:
+            stats.finish()
+        store.close()
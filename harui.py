@@ -0,0 +1,1351 @@
+# Swing user interface of the HARbringer Burp extension.
+# Imported by BurpExtender only when its tab is built, so loading the
+# extension doesn't pull in Swing until it is needed.
+from javax.swing import JPanel, JButton, JScrollPane, JTable, JTextField, JLabel, JOptionPane, JFileChooser, ListSelectionModel, JProgressBar, SwingWorker, Timer, JSpinner, SpinnerNumberModel, JCheckBox, JTextArea
+from javax.swing.event import DocumentListener
+from javax.swing.table import AbstractTableModel
+from java.awt import BorderLayout, FlowLayout, GridLayout, Dimension, Color, Font
+from java.lang import Runtime
+from java.util.concurrent import Callable, Executors, TimeUnit
+import java
+import javax
+import json
+import os
+import traceback
+import time
+from array import array
+from collections import deque
+
+from harcore import (CheckpointStore, ContentCache, HarBodyIndex, HarFilter, HarFollower, HarIndexCache,
+                     HarRowIndex, HarSourceIndex, HarStreamReader, ImportCheckpoint, ImportRules, RateLimitedLog,
+                     StageStats, StringPool, compact_entry, find_har_files, format_duration, format_size,
+                     format_stats, har_format, open_har, pair_digest, parse_range, read_bodies)
+
+# Table model for HAR entries.
+# The row index may still be growing on the loading thread; the table
+# only shows the first `published` rows, advanced on the EDT by publishRows.
+# With a HarFilter set, only the matching rows (listed in `visible`) are
+# shown; entryIndex maps a model row back to its entry. The Source column
+# shows the name of the file each entry was loaded from.
+class HarTableModel(AbstractTableModel):
+    def __init__(self, rows):
+        self.rows = rows
+        self.published = len(rows)
+        self.filter = None
+        self.visible = None
+        self.sources = HarSourceIndex()
+        self.sourceNames = []
+        self.columnNames = ["#", "Method", "URL", "Status", "Length", "MIME Type", "Source"]
+
+    def getColumnCount(self):
+        return len(self.columnNames)
+
+    def getRowCount(self):
+        if self.visible is not None:
+            return len(self.visible)
+        return self.published
+
+    def getColumnName(self, column):
+        return self.columnNames[column]
+    
+    def getColumnClass(self, column):
+        if column == 0:  # Request Number column
+            return java.lang.Integer
+        elif column == 3:  # Status column
+            return java.lang.Integer
+        elif column == 4:  # Length column
+            return java.lang.Integer
+        else:
+            return java.lang.String
+
+    def entryIndex(self, row):
+        if self.visible is not None:
+            return self.visible[row]
+        return row
+
+    def getValueAt(self, row, column):
+        row = self.entryIndex(row)
+        if column == 0: # Request Number
+            return row + 1
+        elif column == 1:
+            return self.rows.methods[row]
+        elif column == 2:
+            return self.rows.urls[row]
+        elif column == 3:
+            return self.rows.statuses[row]
+        elif column == 4:
+            return self.rows.sizes[row]
+        elif column == 5:
+            return self.rows.mimeTypes[row]
+        elif column == 6:
+            return self.sourceNames[self.sources.source(row)]
+        return ""
+
+    def setRows(self, rows, sources=None):
+        self.rows = rows
+        self.published = len(rows)
+        if sources is not None:
+            self.sources = sources
+            self.sourceNames = [os.path.basename(path) for path in sources.paths]
+        self.applyFilter()
+
+    def setFilter(self, row_filter):
+        self.filter = row_filter
+        self.applyFilter()
+
+    def applyFilter(self):
+        if self.filter is None or self.filter.is_empty():
+            self.visible = None
+        else:
+            self.visible = self.filter.select(self.rows, self.published)
+        self.fireTableDataChanged()  # This notifies the table that data has changed
+
+    def publishRows(self):
+        # Show the rows added to the index since the last call
+        count = len(self.rows)
+        if count <= self.published:
+            return
+        first = self.published
+        self.published = count
+        if self.visible is None:
+            self.fireTableRowsInserted(first, count - 1)
+            return
+        shown = len(self.visible)
+        self.visible.extend(row for row in range(first, count) if self.filter.matches(self.rows, row))
+        if len(self.visible) > shown:
+            self.fireTableRowsInserted(shown, len(self.visible) - 1)
+
+    def clearData(self):
+        self.setRows(HarRowIndex(), HarSourceIndex())
+
+
+# Loads a HAR file on a background thread.
+# Parsed entries are appended to the tab's live indexes as they are
+# read, and the EDT load timer publishes the new rows to the table in
+# batches, so the first entries can be browsed and imported while the
+# rest of the file is still loading. A cached index is adopted as a whole
+# in done() instead.
+# BatchLoadWorker runs doInBackground() directly on its pool threads, with
+# separate (rows, entries, bodies) `indexes` and shared `stats`.
+class LoadWorker(SwingWorker):
+    def __init__(self, tab, path, indexes=None, stats=None):
+        SwingWorker.__init__(self)
+        self.tab = tab
+        self.path = path
+        if indexes is None:
+            indexes = (tab.rows, tab.entries, tab.bodyIndex)
+        self.rows, self.entries, self.bodies = indexes
+        self.rules = tab.importRules
+        self.strings = tab.strings
+        self.ownStats = stats is None
+        self.stats = stats or StageStats()
+        self.excluded = 0
+        self.reader = None
+        self.cached = False
+        self.failure = None
+
+    def doInBackground(self):
+        tab = self.tab
+        path = self.path
+        rules = self.rules
+        if rules.filters_nothing():
+            rules = None
+        cache_key = self.rules.key()
+        try:
+            started = time.time()
+            cached = None
+            if self.rules.is_empty() or cache_key is not None:
+                cached = tab.indexCache.load(path, cache_key)
+            if cached is not None:
+                self.rows, self.entries, self.bodies = cached
+                self.cached = True
+                tab.log("[HARbringer] Loaded index from cache in %.2fs" % (time.time() - started))
+            else:
+                # Stream the entries; bodies stay in the file and only their
+                # offsets are kept, to be read through the body store.
+                # Entries excluded by the import rules are dropped here, and
+                # the rest kept in compact form. The row is added last since
+                # it is what makes the entry visible.
+                # Reading and parsing an entry is timed as the parse stage,
+                # filtering and indexing it as the index stage.
+                stats = self.stats
+                with open_har(path) as f:
+                    self.reader = reader = HarStreamReader(f)
+                    position = 0
+                    last = time.time()
+                    for entry, spans in reader.entries():
+                        now = time.time()
+                        stats.add('parse', now - last, reader.position() - position)
+                        position = reader.position()
+                        if rules is not None and not rules.allows(entry):
+                            self.excluded += 1
+                        else:
+                            self.entries.append(compact_entry(entry, self.strings))
+                            self.bodies.add(spans)
+                            self.rows.add(entry)
+                        last = time.time()
+                        stats.add('index', last - now)
+                tab.log("[HARbringer] Parsed %s HAR file (%s read from %s on disk) in %.2fs" % (
+                    har_format(path), format_size(self.reader.position()), format_size(os.path.getsize(path)),
+                    time.time() - started))
+                if self.excluded:
+                    tab.log("[HARbringer] Excluded %d entries by the import rules" % self.excluded)
+
+                if self.rules.is_empty() or cache_key is not None:
+                    try:
+                        tab.indexCache.save(path, self.rows, self.entries, self.bodies, cache_key)
+                    except Exception as e:
+                        tab.log("[HARbringer] Could not write index cache: %s" % str(e))
+
+            tab.log("[HARbringer] Found %d entries in HAR file" % len(self.rows))
+        except Exception as e:
+            tab.log("[HARbringer] Error loading HAR file: %s" % str(e))
+            traceback.print_exc(file=tab._stdout)
+            self.stats.error("load (%s)" % type(e).__name__)
+            self.failure = e
+        if self.ownStats:
+            self.stats.finish()
+        return None
+
+    def done(self):
+        self.tab.load_finished(self)
+
+# Parses one file of a batch on a pool thread
+class ParseTask(Callable):
+    def __init__(self, load):
+        self.load = load
+
+    def call(self):
+        self.load.status = "Parsing"
+        self.load.doInBackground()
+        self.load.status = "Failed" if self.load.failure is not None else "Parsed"
+        return self.load
+
+# Loads several HAR files into one table.
+# Files are parsed concurrently on a fixed pool, each into its own
+# indexes (or from the index cache), and this worker's thread merges each
+# file into the tab's indexes, as one run of entries recorded in the
+# source index. Files are merged in path order, so the table order does not
+# depend on which file finishes first: a file parsed early is held until
+# the files before it are merged. Rows are published by the EDT load timer
+# as for a single file.
+class BatchLoadWorker(SwingWorker):
+    def __init__(self, tab, paths, threads):
+        SwingWorker.__init__(self)
+        self.tab = tab
+        self.paths = paths
+        self.threads = max(1, min(threads, len(paths)))
+        self.rows = tab.rows
+        self.entries = tab.entries
+        self.bodies = tab.bodyIndex
+        self.sources = tab.sources
+        self.bodyStores = tab.bodyStores
+        self.stats = StageStats()
+        self.loads = []
+        for source, path in enumerate(paths):
+            load = LoadWorker(tab, path, (HarRowIndex(), [], HarBodyIndex()), self.stats)
+            load.source = source  # index in paths and bodyStores
+            load.status = "Queued"
+            load.count = 0
+            self.loads.append(load)
+        self.merged = 0
+        self.failed = 0
+        self.failure = None
+
+    def doInBackground(self):
+        tab = self.tab
+        pool = Executors.newFixedThreadPool(self.threads)
+        try:
+            futures = [pool.submit(ParseTask(load)) for load in self.loads]
+            for future in futures:
+                load = future.get()
+                if load.failure is None:
+                    try:
+                        self.merge(load)
+                        continue
+                    except Exception as e:
+                        tab.log("[HARbringer] Error loading HAR file %s: %s" % (load.path, str(e)))
+                        traceback.print_exc(file=tab._stdout)
+                        load.failure = e
+                        load.status = "Failed"
+                self.failed += 1
+        except Exception as e:
+            tab.log("[HARbringer] Error loading HAR files: %s" % str(e))
+            traceback.print_exc(file=tab._stdout)
+            self.stats.error("load (%s)" % type(e).__name__)
+            self.failure = e
+        finally:
+            pool.shutdownNow()
+            self.stats.finish()
+        return None
+
+    def merge(self, load):
+        # The source run, entries and bodies go in before the rows, which
+        # make the entries visible
+        started = time.time()
+        load.status = "Merging"
+        self.bodyStores[load.source] = self.tab.extender.open_body_store(load.path)
+        self.sources.add_run(len(self.entries), load.source)
+        self.entries.extend(load.entries)
+        self.bodies.extend(load.bodies)
+        self.rows.extend(load.rows)
+        load.count = len(load.entries)
+        load.rows = load.entries = load.bodies = None
+        load.status = "Cached" if load.cached else "Done"
+        self.merged += 1
+        self.stats.add('index', time.time() - started)
+
+    def bytes_read(self):
+        total = 0
+        for load in self.loads:
+            reader = load.reader
+            if reader is not None:
+                total += reader.position()
+        return total
+
+    def done(self):
+        self.tab.batch_load_finished(self)
+
+# Per-file progress of a batch load
+class FileTableModel(AbstractTableModel):
+    COLUMNS = ["File", "Status", "Entries", "Read"]
+
+    def __init__(self):
+        self.loads = []
+
+    def setLoads(self, loads):
+        self.loads = loads
+        self.fireTableDataChanged()
+
+    def getColumnCount(self):
+        return len(self.COLUMNS)
+
+    def getRowCount(self):
+        return len(self.loads)
+
+    def getColumnName(self, column):
+        return self.COLUMNS[column]
+
+    def getValueAt(self, row, column):
+        load = self.loads[row]
+        if column == 0:
+            return load.path
+        elif column == 1:
+            if load.failure is not None:
+                return "Failed: %s" % load.failure
+            return load.status
+        elif column == 2:
+            rows = load.rows
+            return len(rows) if rows is not None else load.count
+        elif column == 3:
+            reader = load.reader
+            return format_size(reader.position()) if reader is not None else ""
+        return ""
+
+# Reads the entries appended to a followed file since the last poll, on a
+# background thread, into the tab's indexes like LoadWorker. A poll reads
+# at most BATCH entries so a large backlog shows up in steps.
+class FollowWorker(SwingWorker):
+    BATCH = 5000
+
+    def __init__(self, tab):
+        SwingWorker.__init__(self)
+        self.tab = tab
+        self.follower = tab.follower
+        self.rows = tab.rows
+        self.entries = tab.entries
+        self.bodies = tab.bodyIndex
+        self.rules = tab.importRules
+        self.strings = tab.strings
+        self.stats = tab.loadStats
+        self.first = len(tab.entries)  # entry index of the first new entry
+        self.added = 0
+        self.excluded = 0
+        self.more = False  # the poll stopped at BATCH entries
+        self.failure = None
+
+    def doInBackground(self):
+        rules = self.rules
+        if rules.filters_nothing():
+            rules = None
+        try:
+            started = time.time()
+            cursor = self.follower.cursor or 0
+            found = self.follower.poll(self.BATCH)
+            parsed = time.time()
+            self.stats.add('parse', parsed - started, (self.follower.cursor or 0) - cursor)
+            for entry, spans in found:
+                if rules is not None and not rules.allows(entry):
+                    self.excluded += 1
+                    continue
+                self.entries.append(compact_entry(entry, self.strings))
+                self.bodies.add(spans)
+                self.rows.add(entry)
+                self.added += 1
+            self.stats.add('index', time.time() - parsed)
+            self.more = len(found) >= self.BATCH
+        except Exception as e:
+            self.tab.log("[HARbringer] Error following HAR file: %s" % str(e))
+            traceback.print_exc(file=self.tab._stdout)
+            self.stats.error("follow (%s)" % type(e).__name__)
+            self.failure = e
+        return None
+
+    def done(self):
+        self.tab.follow_polled(self)
+
+# Restarts the filter timer whenever a filter field is edited
+class FilterChangeListener(DocumentListener):
+    def __init__(self, tab):
+        self.tab = tab
+
+    def insertUpdate(self, event):
+        self.tab.filterTimer.restart()
+
+    def removeUpdate(self, event):
+        self.tab.filterTimer.restart()
+
+    def changedUpdate(self, event):
+        self.tab.filterTimer.restart()
+
+# Builds the HttpRequestResponse for one entry on a pool thread.
+# read() runs first on the importing thread, so bodies are read from the
+# HAR in entry order (which compressed inputs rely on); call() does the
+# decoding and building on the pool.
+# call() returns (index, req_resp, key, None) or (index, None, None, (stage,
+# error, traceback text)) so failures are reported by the writer in entry
+# order.
+# Both steps are timed into `stats`, as the read and build stages.
+class BuildTask(Callable):
+    def __init__(self, tab, index, cache, stats):
+        self.tab = tab
+        self.index = index
+        self.cache = cache
+        self.stats = stats
+        self.rawBodies = None
+        self.error = None
+
+    def read(self):
+        started = time.time()
+        try:
+            self.rawBodies = self.tab.read_bodies(self.index)
+            self.stats.add('read', time.time() - started,
+                           sum(len(raw[0]) for raw in self.rawBodies if raw is not None))
+        except Exception as e:
+            self.error = ('read', e, traceback.format_exc())
+        return self
+
+    def call(self):
+        if self.error is not None:
+            return self.index, None, None, self.error
+        started = time.time()
+        try:
+            req_resp, key = self.tab.build_entry(self.index, self.cache, self.rawBodies)
+            self.stats.add('build', time.time() - started)
+            return self.index, req_resp, key, None
+        except Exception as e:
+            return self.index, None, None, ('build', e, traceback.format_exc())
+
+# Imports entries into the site map on a background thread.
+# Entries are decoded and built in parallel on a fixed pool while this
+# thread stays the single writer, calling addToSiteMap in file order. At
+# most queueSize built entries are in flight, which bounds memory.
+# The counters are only read by the EDT progress timer; cancellation is a
+# plain flag so done() still runs after the loop has really stopped.
+# Stage timings and error categories go to `stats`; progress and error
+# messages are rate limited so a large import doesn't flood the output.
+# Every entry added to the site map is recorded in the tab's checkpoint and
+# the imported pair log, saved every few seconds and when the import ends.
+# With skip_imported, entries and pairs recorded there are skipped, which
+# resumes an interrupted import.
+class ImportWorker(SwingWorker):
+    PROGRESS_INTERVAL = 5.0
+    ERROR_INTERVAL = 1.0
+    CHECKPOINT_INTERVAL = 5.0
+
+    def __init__(self, tab, indexes, threads=1, skip_duplicates=False, skip_imported=False):
+        SwingWorker.__init__(self)
+        self.tab = tab
+        self.indexes = indexes  # entry indexes to import, in order
+        self.total = len(indexes)
+        self.threads = max(1, threads)
+        self.queueSize = self.threads * 4
+        self.cache = ContentCache()
+        self.skipDuplicates = skip_duplicates
+        self.seen = set()
+        self.skipImported = skip_imported
+        self.checkpoints = tab.checkpoints
+        self.checkpoint = tab.checkpoint
+        self.checkpointPath = tab.checkpointPath
+        self.checkpointKey = tab.checkpointKey
+        self.nextSave = time.time() + self.CHECKPOINT_INTERVAL
+        self.processed = 0
+        self.count = 0
+        self.errors = 0
+        self.duplicates = 0
+        self.skipped = 0  # imported before
+        self.imported = None
+        self.failure = None
+        self.cancelRequested = False
+        self.automatic = False  # started by follow mode's auto-import
+        self.startTime = time.time()
+        self.stats = StageStats()
+        self.progressLog = RateLimitedLog(tab.log, self.PROGRESS_INTERVAL)
+        self.errorLog = RateLimitedLog(tab.log, self.ERROR_INTERVAL)
+
+    def doInBackground(self):
+        tab = self.tab
+        tab.messageBuilder.stats = self.stats
+        pool = None
+        if self.threads > 1:
+            pool = Executors.newFixedThreadPool(self.threads)
+        pending = deque()
+        try:
+            # the imported pair log is read here rather than on the EDT
+            self.imported = self.checkpoints.imported()
+            for index in self.indexes:
+                if self.cancelRequested:
+                    break
+                if self.skipImported and index in self.checkpoint:
+                    self.skipped += 1
+                    self.processed += 1
+                    continue
+                if pool is None:
+                    self.commit(BuildTask(tab, index, self.cache, self.stats).read().call())
+                    continue
+                pending.append(pool.submit(BuildTask(tab, index, self.cache, self.stats).read()))
+                if len(pending) >= self.queueSize:
+                    self.commit(pending.popleft().get())
+            while pending and not self.cancelRequested:
+                self.commit(pending.popleft().get())
+        except Exception as e:
+            tab.log("[HARbringer] Error during import: %s" % str(e))
+            traceback.print_exc(file=tab._stdout)
+            self.stats.error("import (%s)" % type(e).__name__)
+            self.failure = e
+        finally:
+            for future in pending:
+                future.cancel(False)
+            if pool is not None:
+                pool.shutdownNow()
+            tab.messageBuilder.stats = None
+            self.save_checkpoint()
+            self.stats.finish()
+        return None
+
+    def commit(self, result):
+        index, req_resp, key, error = result
+        tab = self.tab
+        digest = pair_digest(key) if error is None else None
+        if error is None and self.skipDuplicates and key in self.seen:
+            self.duplicates += 1
+        elif error is None and self.skipImported and digest in self.imported:
+            self.checkpoint.add(index)
+            self.skipped += 1
+        elif error is None:
+            if self.skipDuplicates:
+                self.seen.add(key)
+            started = time.time()
+            tab._callbacks.addToSiteMap(req_resp)
+            response = req_resp.getResponse()
+            self.stats.add('addToSiteMap', time.time() - started,
+                           len(req_resp.getRequest()) + (len(response) if response is not None else 0))
+            self.checkpoint.add(index)
+            self.checkpoints.record(digest)
+            self.count += 1
+            self.progressLog.log("[HARbringer] Imported %d entries so far (%.0f entries/s)..." % (
+                self.count, self.count / max(time.time() - self.startTime, 1e-6)))
+        else:
+            stage, e, trace = error
+            self.stats.error("%s (%s)" % (stage, type(e).__name__))
+            if self.errorLog.log("[HARbringer] Error importing entry: %s" % str(e)):
+                tab._stdout.write(trace)
+            self.errors += 1
+        self.processed += 1
+        if time.time() >= self.nextSave:
+            self.save_checkpoint()
+
+    def save_checkpoint(self):
+        # Only called from the worker thread, which owns the checkpoint
+        self.nextSave = time.time() + self.CHECKPOINT_INTERVAL
+        try:
+            if self.checkpointPath is not None:
+                self.checkpoints.save(self.checkpointPath, self.checkpoint, self.checkpointKey)
+            else:
+                self.checkpoints.flush()
+        except Exception as e:
+            self.errorLog.log("[HARbringer] Could not save import checkpoint: %s" % str(e))
+
+    def done(self):
+        self.tab.import_finished(self)
+
+# The HARbringer tab: file loading, the entry table, filter bar, import
+# rules and site map imports.
+# Burp-specific pieces (request/response objects, body stores, scope) come
+# from the extender passed in, see harbringer.py.
+class HarbringerTab(object):
+    RULES_SETTING = 'importRules'
+    FOLLOW_INTERVAL = 1000  # ms between polls of a followed file
+    UNLOAD_TIMEOUT = 10  # seconds to wait for an import to stop
+
+    def __init__(self, extender):
+        self.extender = extender
+        self._callbacks = extender._callbacks
+        self._stdout = extender._stdout
+        self.messageBuilder = extender.messageBuilder
+        self.indexCache = HarIndexCache()
+        self.importRules = self.load_rules()
+        self.checkpoints = CheckpointStore()
+        self.reset_checkpoint()
+
+        self.initUI()
+
+    def initUI(self):
+        self.panel = JPanel(BorderLayout())
+
+        # Top panel for file selection
+        topPanel = JPanel(FlowLayout(FlowLayout.LEFT))
+
+        self.filePathField = JTextField(30)
+        self.filePathField.setEditable(False)
+        self.selectedPaths = []
+
+        browseButton = JButton("Browse", actionPerformed=self.browse_file)
+        self.loadButton = JButton("Load HAR", actionPerformed=self.load_har)
+        self.clearButton = JButton("Clear", actionPerformed=self.clear_table)
+        rulesButton = JButton("Import Rules...", actionPerformed=self.edit_rules)
+
+        # Follow mode: keep reading entries as they are appended to the file
+        self.followCheckBox = JCheckBox("Follow", actionPerformed=self.toggle_follow)
+        self.followCheckBox.setToolTipText(
+            "Keep reading entries appended to the file (a HAR still being written, or NDJSON with one entry per line)")
+        self.autoImportCheckBox = JCheckBox("Auto-import")
+        self.autoImportCheckBox.setToolTipText("Import entries to the site map as they are read in follow mode")
+        self.follower = None
+        self.followWorker = None
+        self.pendingImport = array('i')  # entries read in follow mode, waiting to be auto-imported
+        self.followTimer = Timer(self.FOLLOW_INTERVAL, self.poll_follow)
+
+        
+        topPanel.add(JLabel("HAR File:"))
+        topPanel.add(self.filePathField)
+        topPanel.add(browseButton)
+        topPanel.add(self.loadButton)
+        topPanel.add(self.clearButton)
+        topPanel.add(self.followCheckBox)
+        topPanel.add(self.autoImportCheckBox)
+        topPanel.add(rulesButton)
+
+        # Filter bar; edits are applied after a short pause in typing
+        filterPanel = JPanel(FlowLayout(FlowLayout.LEFT))
+        self.filterFields = {}
+        for name, label, columns in (('host', "Host:", 12), ('path', "Path:", 16), ('method', "Method:", 5),
+                                     ('status', "Status:", 6), ('mime', "MIME:", 10), ('size', "Size:", 6)):
+            field = JTextField(columns)
+            field.getDocument().addDocumentListener(FilterChangeListener(self))
+            filterPanel.add(JLabel(label))
+            filterPanel.add(field)
+            self.filterFields[name] = field
+        self.filterStatusLabel = JLabel("")
+        filterPanel.add(self.filterStatusLabel)
+        self.filterTimer = Timer(150, self.apply_filter)
+        self.filterTimer.setRepeats(False)
+
+        northPanel = JPanel(BorderLayout())
+        northPanel.add(topPanel, BorderLayout.NORTH)
+        northPanel.add(filterPanel, BorderLayout.SOUTH)
+        self.panel.add(northPanel, BorderLayout.NORTH)
+
+        # Table for HAR entries
+        self.rows = HarRowIndex()
+        self.entries = []  # compact_entry() tuples
+        self.strings = StringPool()  # shared by the entries of the loaded files
+        self.bodyIndex = HarBodyIndex()
+        self.sources = HarSourceIndex()
+        self.bodyStores = []  # one per source file
+        self.tableModel = HarTableModel(self.rows)
+        self.table = JTable(self.tableModel)
+        self.table.setAutoCreateRowSorter(True)
+
+        # Several rows can be selected and sent together
+        self.table.setSelectionMode(javax.swing.ListSelectionModel.MULTIPLE_INTERVAL_SELECTION)
+
+
+        scrollPane = JScrollPane(self.table)
+        scrollPane.setPreferredSize(Dimension(800, 400))
+
+        # Per-stage timings of the last load and import, below the table
+        self.loadStats = None
+        self.importStats = None
+        self.statsArea = JTextArea(10, 80)
+        self.statsArea.setEditable(False)
+        self.statsArea.setFont(Font(Font.MONOSPACED, Font.PLAIN, 12))
+        self.statsPane = JScrollPane(self.statsArea)
+        self.statsPane.setVisible(False)
+
+        # Per-file progress, above the table when several files are loaded
+        self.fileTableModel = FileTableModel()
+        self.filesPane = JScrollPane(JTable(self.fileTableModel))
+        self.filesPane.setPreferredSize(Dimension(800, 120))
+        self.filesPane.setVisible(False)
+
+        self.centerPanel = JPanel(BorderLayout())
+        self.centerPanel.add(self.filesPane, BorderLayout.NORTH)
+        self.centerPanel.add(scrollPane, BorderLayout.CENTER)
+        self.centerPanel.add(self.statsPane, BorderLayout.SOUTH)
+        self.panel.add(self.centerPanel, BorderLayout.CENTER)
+
+        # set column widths
+        self.table.getColumnModel().getColumn(0).setPreferredWidth(30)  # Request Number
+        self.table.getColumnModel().getColumn(1).setPreferredWidth(50)  # Method
+        self.table.getColumnModel().getColumn(2).setPreferredWidth(800)  # URL
+        self.table.getColumnModel().getColumn(3).setPreferredWidth(50)  # Status
+        self.table.getColumnModel().getColumn(4).setPreferredWidth(50)  # Length
+        self.table.getColumnModel().getColumn(5).setPreferredWidth(150)  # MIME Type
+        self.table.getColumnModel().getColumn(6).setPreferredWidth(150)  # Source
+
+
+        # Set maximum widths for non-URL columns
+        self.table.getColumnModel().getColumn(0).setMaxWidth(30)  # Request Number
+        self.table.getColumnModel().getColumn(1).setMaxWidth(50)  # Method
+        self.table.getColumnModel().getColumn(3).setMaxWidth(50)  # Status
+        self.table.getColumnModel().getColumn(4).setMaxWidth(50)  # Length
+        self.table.getColumnModel().getColumn(5).setMaxWidth(150)  # MIME Type
+
+
+
+
+        # Bottom panel for actions
+        buttonPanel = JPanel(FlowLayout(FlowLayout.LEFT))
+
+        self.sendToHistoryButton = JButton("Send to Site Map", actionPerformed=self.send_selected_to_http_history)
+        self.importAllButton = JButton("Import All to Site Map", actionPerformed=self.import_all_to_sitemap)
+        self.importFilteredButton = JButton("Import Filtered to Site Map", actionPerformed=self.import_filtered_to_sitemap)
+
+        # Number of threads decoding entries during Import All and parsing
+        # files of a batch load. Defaults to 1 (serial): the pool has not
+        # been shown to be faster, see Benchmarks in the README.
+        processors = Runtime.getRuntime().availableProcessors()
+        self.threadsSpinner = JSpinner(SpinnerNumberModel(1, 1, max(64, processors), 1))
+
+        buttonPanel.add(self.sendToHistoryButton)
+        buttonPanel.add(self.importAllButton)
+        buttonPanel.add(self.importFilteredButton)
+        buttonPanel.add(JLabel("Threads:"))
+        buttonPanel.add(self.threadsSpinner)
+
+        # Drop request/response pairs identical to one already imported
+        self.skipDuplicatesCheckBox = JCheckBox("Skip duplicates")
+        buttonPanel.add(self.skipDuplicatesCheckBox)
+
+        # Resume an interrupted import: skip entries and request/response
+        # pairs already imported, from this or any other HAR file
+        self.skipImportedCheckBox = JCheckBox("Skip imported")
+        self.skipImportedCheckBox.setToolTipText(
+            "Skip entries already imported to the site map from this or another HAR file")
+        self.forgetImportsButton = JButton("Forget Imports...", actionPerformed=self.forget_imports)
+        buttonPanel.add(self.skipImportedCheckBox)
+        buttonPanel.add(self.forgetImportsButton)
+
+        self.statsCheckBox = JCheckBox("Stats", actionPerformed=self.toggle_stats)
+        self.exportStatsButton = JButton("Export Stats...", actionPerformed=self.export_stats)
+        buttonPanel.add(self.statsCheckBox)
+        buttonPanel.add(self.exportStatsButton)
+
+        # Import progress, only shown while an import is running
+        self.importWorker = None
+        self.importProgressBar = JProgressBar(0, 1)
+        self.importProgressBar.setStringPainted(True)
+        self.importProgressBar.setVisible(False)
+        self.cancelButton = JButton("Cancel", actionPerformed=self.cancel_import)
+        self.cancelButton.setVisible(False)
+        self.importStatusLabel = JLabel("")
+        self.progressTimer = Timer(250, self.update_import_progress)
+        self.loadWorker = None
+        self.loadTimer = Timer(250, self.update_load_progress)
+
+        buttonPanel.add(self.importProgressBar)
+        buttonPanel.add(self.cancelButton)
+        buttonPanel.add(self.importStatusLabel)
+
+        self.panel.add(buttonPanel, BorderLayout.SOUTH)
+
+        # button state
+        self.sendToHistoryButton.setEnabled(False)
+        self.importAllButton.setEnabled(False)
+        self.importFilteredButton.setEnabled(False)
+        self.clearButton.setEnabled(False)
+        self.loadButton.setEnabled(False)
+        self.exportStatsButton.setEnabled(False)
+
+    def log(self, message):
+        self.extender.log(message)
+
+    def browse_file(self, event):
+        # Any number of files and directories can be chosen; directories
+        # are searched for HAR files when loading
+        fileChooser = JFileChooser()
+        fileChooser.setMultiSelectionEnabled(True)
+        fileChooser.setFileSelectionMode(JFileChooser.FILES_AND_DIRECTORIES)
+        result = fileChooser.showOpenDialog(self.panel)
+
+        if result == JFileChooser.APPROVE_OPTION:
+            self.selectedPaths = [f.getAbsolutePath() for f in fileChooser.getSelectedFiles()]
+            if len(self.selectedPaths) == 1:
+                self.filePathField.setText(self.selectedPaths[0])
+            else:
+                self.filePathField.setText("%d files and directories" % len(self.selectedPaths))
+            self.update_buttons()
+
+    def load_rules(self):
+        # Import rules saved with the extension settings
+        try:
+            saved = self._callbacks.loadExtensionSetting(self.RULES_SETTING)
+            if saved:
+                return ImportRules(json.loads(saved), self.extender.in_scope)
+        except Exception as e:
+            self.log("[HARbringer] Ignoring saved import rules: %s" % str(e))
+        return ImportRules(in_scope=self.extender.in_scope)
+
+    def edit_rules(self, event):
+        settings = self.importRules.settings
+        panel = JPanel(GridLayout(0, 2, 4, 4))
+        fields = {}
+        for name, label in (('includeHosts', "Include hosts (e.g. *.example.com):"),
+                            ('excludeHosts', "Exclude hosts:"),
+                            ('methods', "Methods (e.g. GET, POST):"),
+                            ('includeMimeTypes', "Include MIME types (e.g. text/*):"),
+                            ('excludeMimeTypes', "Exclude MIME types (e.g. image/*, font/*):"),
+                            ('status', "Status (e.g. 200-399):"),
+                            ('maxBodySize', "Truncate bodies over (e.g. 1m):")):
+            fields[name] = JTextField(settings[name], 20)
+            panel.add(JLabel(label))
+            panel.add(fields[name])
+        inScopeCheckBox = JCheckBox("Only entries in Burp's target scope", settings['inScopeOnly'])
+        panel.add(inScopeCheckBox)
+        panel.add(JLabel("Rules apply the next time a file is loaded."))
+
+        while True:
+            result = JOptionPane.showConfirmDialog(self.panel, panel, "Import Rules",
+                                                   JOptionPane.OK_CANCEL_OPTION, JOptionPane.PLAIN_MESSAGE)
+            if result != JOptionPane.OK_OPTION:
+                return
+            new_settings = dict((name, field.getText().strip()) for name, field in fields.items())
+            new_settings['inScopeOnly'] = inScopeCheckBox.isSelected()
+            try:
+                rules = ImportRules(new_settings, self.extender.in_scope)
+                break
+            except ValueError as e:
+                JOptionPane.showMessageDialog(None, "Error: " + str(e), "Error", JOptionPane.ERROR_MESSAGE)
+
+        self.importRules = rules
+        self._callbacks.saveExtensionSetting(self.RULES_SETTING, json.dumps(rules.settings))
+        self.log("[HARbringer] Import rules updated")
+
+    def apply_filter(self, event):
+        fields = self.filterFields
+        ranges = {}
+        for name in ('status', 'size'):
+            field = fields[name]
+            try:
+                ranges[name] = parse_range(field.getText())
+                field.setForeground(Color.BLACK)
+            except ValueError:
+                ranges[name] = None
+                field.setForeground(Color.RED)
+
+        row_filter = HarFilter(fields['host'].getText(), fields['path'].getText(), fields['method'].getText(),
+                               fields['mime'].getText(), ranges['status'], ranges['size'])
+        started = time.time()
+        self.tableModel.setFilter(row_filter)
+        self.update_filter_status(time.time() - started)
+        self.update_buttons()
+
+    def update_filter_status(self, elapsed=None):
+        model = self.tableModel
+        if model.visible is None:
+            self.filterStatusLabel.setText("")
+        elif elapsed is None:
+            self.filterStatusLabel.setText("%d of %d entries" % (model.getRowCount(), model.published))
+        else:
+            self.filterStatusLabel.setText("%d of %d entries (%.0f ms)" % (
+                model.getRowCount(), model.published, elapsed * 1000))
+
+    def update_buttons(self):
+        # Loading and importing can overlap, but not with loading another
+        # file or clearing the table
+        idle = self.loadWorker is None and self.importWorker is None
+        has_rows = self.tableModel.getRowCount() > 0
+        self.loadButton.setEnabled(idle and self.follower is None and bool(self.filePathField.getText()))
+        self.clearButton.setEnabled(idle and has_rows)
+        self.sendToHistoryButton.setEnabled(self.importWorker is None and has_rows)
+        self.importAllButton.setEnabled(self.importWorker is None and self.tableModel.published > 0)
+        self.importFilteredButton.setEnabled(self.importWorker is None and has_rows
+                                             and self.tableModel.visible is not None)
+        self.threadsSpinner.setEnabled(self.importWorker is None)
+        self.skipDuplicatesCheckBox.setEnabled(self.importWorker is None)
+        self.skipImportedCheckBox.setEnabled(self.importWorker is None)
+        self.forgetImportsButton.setEnabled(self.importWorker is None)
+
+    def load_har(self, event):
+        if not self.selectedPaths:
+            JOptionPane.showMessageDialog(None, "Please select a HAR file.", "Error", JOptionPane.ERROR_MESSAGE)
+            return
+
+        if self.loadWorker is not None or self.follower is not None:
+            return
+
+        paths = find_har_files(self.selectedPaths)
+        if not paths:
+            JOptionPane.showMessageDialog(None, "No HAR files found.", "Error", JOptionPane.ERROR_MESSAGE)
+            return
+        if len(paths) > 1:
+            if self.followCheckBox.isSelected():
+                JOptionPane.showMessageDialog(None, "Follow mode works on a single file.", "Error",
+                                              JOptionPane.ERROR_MESSAGE)
+                return
+            self.load_batch(paths)
+            return
+        filePath = paths[0]
+
+        follower = None
+        try:
+            self.log("[HARbringer] Loading HAR file: %s" % filePath)
+            if self.followCheckBox.isSelected():
+                follower = HarFollower(filePath)
+            self.close_body_stores()
+            self.bodyStores = [self.extender.open_body_store(filePath)]
+        except Exception as e:
+            self.log("[HARbringer] Error loading HAR file: %s" % str(e))
+            traceback.print_exc(file=self._stdout)
+            JOptionPane.showMessageDialog(None, "Error: " + str(e), "Error", JOptionPane.ERROR_MESSAGE)
+            return
+
+        # Entry indexes only match an earlier import under the same rules,
+        # and can't be relied on when the rules depend on Burp's scope or
+        # the file is still growing
+        self.reset_checkpoint()
+        key = self.importRules.key() if follower is None else None
+        checkpoint = self.checkpoints.load(filePath, key) if key is not None else None
+        if key is not None:
+            self.checkpointPath = filePath
+            self.checkpointKey = key
+        if checkpoint is not None:
+            self.checkpoint = checkpoint
+            if checkpoint.count():
+                self.log("[HARbringer] %d entries of this file were imported before, the last one was #%d; "
+                         "tick \"Skip imported\" to skip them" % (checkpoint.count(), checkpoint.last + 1))
+
+        # Parse in the background into fresh indexes; the load timer shows
+        # new rows in batches while the rest of the file is still loading
+        self.messageBuilder.maxBodySize = self.importRules.maxBodySize
+        self.rows = HarRowIndex()
+        self.entries = []
+        self.strings = StringPool()
+        self.bodyIndex = HarBodyIndex()
+        self.sources = HarSourceIndex([filePath])
+        self.tableModel.setRows(self.rows, self.sources)
+        self.show_files(None)
+        if follower is not None:
+            self.start_follow(follower)
+            return
+        self.loadWorker = LoadWorker(self, filePath)
+        self.loadStats = self.loadWorker.stats
+        self.importStats = None
+        self.update_buttons()
+        self.loadTimer.start()
+        self.loadWorker.execute()
+
+    def load_batch(self, paths):
+        # Several files are parsed in parallel, on as many threads as
+        # imports use. Entry indexes of a merged table don't match those of
+        # a single file, so only the imported pair log applies to it.
+        self.log("[HARbringer] Loading %d HAR files" % len(paths))
+        self.close_body_stores()
+        self.reset_checkpoint()
+        self.messageBuilder.maxBodySize = self.importRules.maxBodySize
+        self.rows = HarRowIndex()
+        self.entries = []
+        self.strings = StringPool()
+        self.bodyIndex = HarBodyIndex()
+        self.sources = HarSourceIndex(paths)
+        self.bodyStores = [None] * len(paths)
+        self.tableModel.setRows(self.rows, self.sources)
+        self.loadWorker = BatchLoadWorker(self, paths, self.threadsSpinner.getValue())
+        self.loadStats = self.loadWorker.stats
+        self.importStats = None
+        self.show_files(self.loadWorker.loads)
+        self.update_buttons()
+        self.loadTimer.start()
+        self.loadWorker.execute()
+
+    def show_files(self, loads):
+        # Shows per-file progress for a batch load, or hides it for None
+        self.fileTableModel.setLoads(loads or [])
+        self.filesPane.setVisible(loads is not None)
+        self.centerPanel.revalidate()
+
+    def start_follow(self, follower):
+        self.follower = follower
+        self.pendingImport = array('i')
+        self.loadStats = StageStats()
+        self.importStats = None
+        self.log("[HARbringer] Following HAR file: %s" % follower.path)
+        self.update_buttons()
+        self.followTimer.start()
+        self.poll_follow(None)
+
+    def stop_follow(self):
+        if self.follower is None:
+            return
+        self.followTimer.stop()
+        self.log("[HARbringer] Stopped following %s after %d entries" % (self.follower.path, len(self.rows)))
+        self.follower = None
+        self.pendingImport = array('i')
+        self.loadStats.finish()
+        self.followCheckBox.setSelected(False)
+        self.importStatusLabel.setText("")
+        self.update_buttons()
+
+    def toggle_follow(self, event):
+        # Unticking Follow stops following; ticking it applies to the next load
+        if not self.followCheckBox.isSelected():
+            self.stop_follow()
+
+    def poll_follow(self, event):
+        if self.follower is None or self.followWorker is not None:
+            return
+        self.followWorker = FollowWorker(self)
+        self.followWorker.execute()
+
+    def follow_polled(self, worker):
+        self.followWorker = None
+        if worker.follower is not self.follower:
+            return  # stopped or cleared meanwhile
+
+        if worker.failure is not None:
+            self.stop_follow()
+            JOptionPane.showMessageDialog(None, "Error: " + str(worker.failure), "Error", JOptionPane.ERROR_MESSAGE)
+            return
+
+        if worker.added:
+            self.tableModel.publishRows()
+            self.update_filter_status()
+            self.update_buttons()
+            self.update_stats_view()
+            if self.autoImportCheckBox.isSelected():
+                self.pendingImport.extend(range(worker.first, worker.first + worker.added))
+        if self.importWorker is None:
+            self.importStatusLabel.setText("Following: %d entries (%s read)" % (
+                len(self.rows), format_size(self.follower.cursor or 0)))
+        self.import_pending()
+        if worker.more:
+            self.poll_follow(None)
+
+    def import_pending(self):
+        # Auto-import of followed entries, in batches of whatever was read
+        # while the previous import ran
+        if self.importWorker is not None or not self.pendingImport:
+            return
+        indexes = self.pendingImport
+        self.pendingImport = array('i')
+        self.start_import(indexes, True)
+
+    def update_load_progress(self, event):
+        worker = self.loadWorker
+        if worker is None:
+            return
+        self.tableModel.publishRows()
+        self.update_filter_status()
+        if isinstance(worker, BatchLoadWorker):
+            self.fileTableModel.fireTableRowsUpdated(0, len(worker.loads) - 1)
+            self.importStatusLabel.setText("Loading... %d of %d files, %d entries (%s read)" % (
+                worker.merged + worker.failed, len(worker.loads), self.tableModel.getRowCount(),
+                format_size(worker.bytes_read())))
+        elif worker.reader is not None:
+            self.importStatusLabel.setText("Loading... %d entries (%s read)" % (
+                self.tableModel.getRowCount(), format_size(worker.reader.position())))
+        self.update_buttons()
+        self.update_stats_view()
+
+    def load_finished(self, worker):
+        self.loadTimer.stop()
+        self.loadWorker = None
+
+        if worker.cached:
+            self.rows = worker.rows
+            self.entries = worker.entries
+            self.bodyIndex = worker.bodies
+            self.tableModel.setRows(self.rows)
+        else:
+            self.tableModel.publishRows()
+        self.update_filter_status()
+        self.update_buttons()
+        self.update_stats_view()
+        self.importStatusLabel.setText("")
+
+        if worker.failure is not None:
+            JOptionPane.showMessageDialog(None, "Error: " + str(worker.failure), "Error", JOptionPane.ERROR_MESSAGE)
+            return
+
+        self.log("[HARbringer] Imported %d entries successfully" % len(self.rows))
+        JOptionPane.showMessageDialog(None, "Imported %d entries successfully." % len(self.rows), "Success", JOptionPane.INFORMATION_MESSAGE)
+
+    def batch_load_finished(self, worker):
+        self.loadTimer.stop()
+        self.loadWorker = None
+        self.tableModel.publishRows()
+        self.fileTableModel.fireTableDataChanged()
+        self.update_filter_status()
+        self.update_buttons()
+        self.update_stats_view()
+        self.importStatusLabel.setText("")
+
+        if worker.failure is not None:
+            JOptionPane.showMessageDialog(None, "Error: " + str(worker.failure), "Error", JOptionPane.ERROR_MESSAGE)
+            return
+
+        summary = "Loaded %d entries from %d files in %s." % (
+            len(self.rows), worker.merged, format_duration(worker.stats.snapshot()['elapsed']))
+        if worker.failed:
+            summary += " %d files could not be loaded, see the file list." % worker.failed
+        self.log("[HARbringer] %s" % summary)
+        JOptionPane.showMessageDialog(None, summary, "Load Complete", JOptionPane.INFORMATION_MESSAGE)
+
+    def send_selected_to_http_history(self, event):
+        rows = self.table.getSelectedRows()
+
+        if len(rows) == 0:
+            JOptionPane.showMessageDialog(None, "No row selected.", "Error", JOptionPane.ERROR_MESSAGE)
+            return
+
+        # Selected view rows -> entry indexes, in file order so bodies are
+        # read front to back
+        indexes = sorted(set(self.tableModel.entryIndex(self.table.convertRowIndexToModel(row)) for row in rows))
+
+        if indexes[-1] >= len(self.rows):
+            JOptionPane.showMessageDialog(None, "Invalid selection.", "Error", JOptionPane.ERROR_MESSAGE)
+            return
+
+        self.start_import(indexes)
+
+    def close_body_stores(self):
+        for store in self.bodyStores:
+            if store is not None:
+                store.close()
+        self.bodyStores = []
+
+    def clear_table(self, event):
+        self.stop_follow()
+        self.tableModel.clearData()
+        self.rows = self.tableModel.rows
+        self.sources = self.tableModel.sources
+        self.entries = []
+        self.strings = StringPool()
+        self.bodyIndex = HarBodyIndex()
+        self.close_body_stores()
+        self.show_files(None)
+        self.reset_checkpoint()
+        # Disable buttons after clearing
+        self.update_buttons()
+
+    def reset_checkpoint(self):
+        # An empty checkpoint that is not saved, until a file is loaded
+        self.checkpoint = ImportCheckpoint()
+        self.checkpointPath = None
+        self.checkpointKey = None
+
+    def forget_imports(self, event):
+        result = JOptionPane.showConfirmDialog(
+            self.panel, "Forget which entries have been imported, from all HAR files?\n"
+            "Use this after switching to a new Burp project.", "Forget Imports", JOptionPane.YES_NO_OPTION)
+        if result != JOptionPane.YES_OPTION:
+            return
+        try:
+            self.checkpoints.clear()
+            self.checkpoint = ImportCheckpoint()
+            self.log("[HARbringer] Forgot all imported entries")
+        except Exception as e:
+            self.log("[HARbringer] Error clearing import checkpoints: %s" % str(e))
+            traceback.print_exc(file=self._stdout)
+            JOptionPane.showMessageDialog(None, "Error: " + str(e), "Error", JOptionPane.ERROR_MESSAGE)
+
+
+    def import_all_to_sitemap(self, event):
+        if self.tableModel.published == 0:
+            JOptionPane.showMessageDialog(None, "No entries to import.", "Error", JOptionPane.ERROR_MESSAGE)
+            return
+
+        self.start_import(range(self.tableModel.published))
+
+    def import_filtered_to_sitemap(self, event):
+        visible = self.tableModel.visible
+        if visible is None:
+            self.import_all_to_sitemap(event)
+            return
+
+        if len(visible) == 0:
+            JOptionPane.showMessageDialog(None, "No entries match the filter.", "Error", JOptionPane.ERROR_MESSAGE)
+            return
+
+        # Copy, the filter may change while the import runs
+        self.start_import(array('i', visible))
+
+    def start_import(self, indexes, automatic=False):
+        if self.importWorker is not None:
+            return
+
+        # Run the import off the Swing event thread; the timer refreshes the
+        # progress display a few times per second instead of once per entry
+        threads = self.threadsSpinner.getValue()
+        skip_duplicates = self.skipDuplicatesCheckBox.isSelected()
+        skip_imported = self.skipImportedCheckBox.isSelected()
+        self.importWorker = ImportWorker(self, indexes, threads, skip_duplicates, skip_imported)
+        self.importWorker.automatic = automatic
+        self.importStats = self.importWorker.stats
+        self.set_importing(True)
+        self.progressTimer.start()
+        self.importWorker.execute()
+
+    def cancel_import(self, event):
+        if self.importWorker is not None:
+            self.importWorker.cancelRequested = True
+            self.cancelButton.setEnabled(False)
+            self.importStatusLabel.setText("Cancelling...")
+
+    def unload(self):
+        # Stops a running import, waiting a little for it to save its
+        # checkpoint, and releases the HAR file
+        worker = self.importWorker
+        if worker is not None:
+            worker.cancelRequested = True
+            try:
+                worker.get(self.UNLOAD_TIMEOUT, TimeUnit.SECONDS)
+            except Exception:
+                pass
+        self.progressTimer.stop()
+        self.loadTimer.stop()
+        self.stop_follow()
+        self.close_body_stores()
+
+    def set_importing(self, importing):
+        self.importProgressBar.setVisible(importing)
+        self.cancelButton.setVisible(importing)
+        self.cancelButton.setEnabled(importing)
+        self.update_buttons()
+        if importing:
+            self.importProgressBar.setMaximum(max(self.importWorker.total, 1))
+            self.importProgressBar.setValue(0)
+            self.importStatusLabel.setText("Starting import...")
+
+    def update_import_progress(self, event):
+        worker = self.importWorker
+        if worker is None:
+            return
+        self.importProgressBar.setValue(worker.processed)
+        if worker.cancelRequested:
+            return
+        elapsed = time.time() - worker.startTime
+        rate = worker.processed / elapsed if elapsed > 0 else 0.0
+        if rate > 0:
+            eta = format_duration((worker.total - worker.processed) / rate)
+        else:
+            eta = "--:--"
+        self.importStatusLabel.setText("%d / %d entries (%d errors), %.0f entries/s, ETA %s" % (
+            worker.processed, worker.total, worker.errors, rate, eta))
+        self.update_stats_view()
+
+    def import_finished(self, worker):
+        self.progressTimer.stop()
+        self.importWorker = None
+        self.set_importing(False)
+        self.update_stats_view()
+
+        errors = worker.stats.snapshot()['errors']
+        if errors:
+            self.log("[HARbringer] Import errors by category: %s" % ", ".join(
+                "%s %d" % (category, count) for category, count in sorted(errors.items())))
+
+        # A failed or cancelled auto-import turns auto-import off rather
+        # than starting the next batch
+        if worker.automatic and (worker.failure is not None or worker.cancelRequested):
+            self.autoImportCheckBox.setSelected(False)
+            self.pendingImport = array('i')
+
+        elapsed = time.time() - worker.startTime
+        if worker.failure is not None:
+            self.importStatusLabel.setText("Import failed")
+            JOptionPane.showMessageDialog(None, "Error: " + str(worker.failure), "Error", JOptionPane.ERROR_MESSAGE)
+            return
+
+        if worker.cancelRequested:
+            summary = "Import cancelled. Imported %d entries with %d errors." % (worker.count, worker.errors)
+            title = "Import Cancelled"
+        else:
+            summary = "Imported %d entries with %d errors." % (worker.count, worker.errors)
+            title = "Import Complete"
+        if worker.duplicates:
+            summary += " Skipped %d duplicates." % worker.duplicates
+        if worker.skipped:
+            summary += " Skipped %d entries imported before." % worker.skipped
+        summary += " Reused %s of identical content." % format_size(worker.cache.bytes_saved())
+        self.importStatusLabel.setText("%s (%s)" % (summary, format_duration(elapsed)))
+        rate = worker.processed / elapsed if elapsed > 0 else 0.0
+        self.log("[HARbringer] %s Took %.1fs (%.0f entries/s with %d thread(s))." % (summary, elapsed, rate, worker.threads))
+        self.import_pending()
+        if worker.automatic:
+            return
+        JOptionPane.showMessageDialog(None, summary, title, JOptionPane.INFORMATION_MESSAGE)
+
+    def toggle_stats(self, event):
+        self.statsPane.setVisible(self.statsCheckBox.isSelected())
+        self.update_stats_view()
+        self.centerPanel.revalidate()
+
+    def stats_snapshot(self):
+        # {'load': snapshot or None, 'import': snapshot or None}
+        return {
+            'load': self.loadStats.snapshot() if self.loadStats is not None else None,
+            'import': self.importStats.snapshot() if self.importStats is not None else None,
+        }
+
+    def update_stats_view(self):
+        self.exportStatsButton.setEnabled(self.loadStats is not None or self.importStats is not None)
+        if not self.statsPane.isVisible():
+            return
+        sections = []
+        for name, snapshot in sorted(self.stats_snapshot().items()):
+            if snapshot is not None:
+                sections.append("%s\n%s" % (name.capitalize(), format_stats(snapshot)))
+        self.statsArea.setText("\n\n".join(sections) or "No load or import yet.")
+
+    def export_stats(self, event):
+        fileChooser = JFileChooser()
+        fileChooser.setSelectedFile(java.io.File("harbringer-stats.json"))
+        if fileChooser.showSaveDialog(self.panel) != JFileChooser.APPROVE_OPTION:
+            return
+        path = fileChooser.getSelectedFile().getAbsolutePath()
+        try:
+            with open(path, 'w') as f:
+                json.dump(self.stats_snapshot(), f, indent=2, sort_keys=True)
+            self.log("[HARbringer] Stats written to %s" % path)
+        except Exception as e:
+            self.log("[HARbringer] Error writing stats: %s" % str(e))
+            traceback.print_exc(file=self._stdout)
+            JOptionPane.showMessageDialog(None, "Error: " + str(e), "Error", JOptionPane.ERROR_MESSAGE)
+
+    def read_bodies(self, index):
+        # Bodies are only read from the HAR file when the entry is built,
+        # and only as far as needed when they will be truncated
+        store = self.bodyStores[self.sources.source(index)]
+        return read_bodies(store, self.bodyIndex.spans(index), self.messageBuilder.raw_limit())
+
+    def build_entry(self, index, cache=None, raw_bodies=None):
+        # Returns (req_resp, key); see MessageBuilder.build in harcore
+        if raw_bodies is None:
+            raw_bodies = self.read_bodies(index)
+        host, port, protocol, request_bytes, response_bytes, key = self.messageBuilder.build(
+            self.entries[index], raw_bodies, cache)
+
+        return self.extender.request_response(host, port, protocol, request_bytes, response_bytes), key
+
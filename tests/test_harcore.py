@@ -0,0 +1,601 @@
+# -*- coding: utf-8 -*-
+# Tests for the pure-Python core in harcore.py, runnable under Python 2.7,
+# Python 3 and Jython without Burp:
+#
+#   python -m unittest discover tests
+import base64
+import gzip
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import zipfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from harcore import (CheckpointStore, DigestSet, HarBodyIndex, HarFilter, HarFollower, HarIndexCache, HarRowIndex,
+                     HarStreamReader, ImportCheckpoint, ImportRules, MessageBuilder, TruncatedHarError,
+                     compact_entry, find_har_files, pair_digest, parse_range, parse_size, read_bodies)
+
+def make_entry(url='http://example.com/a', method='GET', status=200, request_text=None, response_text='',
+               mime_type='text/plain', encoding=None, headers=None):
+    request = {'method': method, 'url': url, 'headers': headers or [{'name': 'Host', 'value': 'example.com'}]}
+    if request_text is not None:
+        request['postData'] = {'mimeType': 'application/x-www-form-urlencoded', 'text': request_text}
+    content = {'mimeType': mime_type, 'text': response_text, 'size': len(response_text)}
+    if encoding:
+        content['encoding'] = encoding
+    response = {'status': status, 'statusText': 'OK', 'headers': [{'name': 'Content-Type', 'value': mime_type}],
+                'content': content}
+    return {'request': request, 'response': response, 'timings': {'wait': 1}}
+
+def make_har(entries, bom=False, indent=None):
+    data = json.dumps({'log': {'version': '1.2', 'pages': [{'title': 'a "quoted" ] } title'}],
+                               'entries': entries}}, indent=indent).encode('utf-8')
+    return (b'\xef\xbb\xbf' if bom else b'') + data
+
+# In-memory body store over the HAR bytes, like FileBodyStore
+class BytesBodyStore(object):
+    def __init__(self, data):
+        self.data = data
+
+    def read(self, offset, length):
+        return self.data[offset:offset + length]
+
+class HarStreamReaderTest(unittest.TestCase):
+    TEXTS = [u'plain', u'', u'quote " and backslash \\ and \\" both', u'café ☃', u'\\' * 7,
+             u'ends with backslash \\', u'"', u'line\nbreak\ttab']
+
+    def entries(self, data, chunk_size=None):
+        return list(HarStreamReader(io.BytesIO(data), chunk_size).entries())
+
+    def check_bodies(self, data, chunk_size=None):
+        found = self.entries(data, chunk_size)
+        self.assertEqual(len(found), len(self.TEXTS))
+        for text, (entry, spans) in zip(self.TEXTS, found):
+            self.assertEqual(entry['response']['content']['text'], '')
+            self.assertEqual(entry['timings'], {'wait': 1})
+            if not text:
+                self.assertEqual(spans, (None, None))
+                continue
+            offset, length, escaped = spans[1]
+            raw = data[offset:offset + length]
+            self.assertEqual(json.loads(b'"'.join([b'', raw, b'']).decode('utf-8')), text)
+            self.assertEqual(escaped, int(b'\\' in raw))
+        return found
+
+    def test_bodies_are_cut_out_with_their_spans(self):
+        data = make_har([make_entry(response_text=text) for text in self.TEXTS])
+        self.check_bodies(data)
+
+    def test_chunk_boundaries(self):
+        data = make_har([make_entry(response_text=text) for text in self.TEXTS], indent=1)
+        expected = self.check_bodies(data)
+        for chunk_size in range(1, 40):
+            self.assertEqual(self.check_bodies(data, chunk_size), expected)
+
+    def test_non_ascii_escapes(self):
+        data = make_har([make_entry(response_text=text) for text in self.TEXTS]).replace(b'\\u00e9', b'\xc3\xa9')
+        self.check_bodies(data, 5)
+
+    def test_bom(self):
+        data = make_har([make_entry(response_text=text) for text in self.TEXTS], bom=True)
+        found = self.check_bodies(data, 2)
+        self.assertEqual(found[0][0]['request']['url'], 'http://example.com/a')
+
+    def test_request_and_response_bodies(self):
+        data = make_har([make_entry(method='POST', request_text='a=1&b=2', response_text='ok')])
+        [(entry, spans)] = self.entries(data)
+        self.assertEqual(entry['request']['postData']['text'], '')
+        self.assertEqual([data[offset:offset + length] for offset, length, escaped in spans], [b'a=1&b=2', b'ok'])
+
+    def test_no_entries(self):
+        self.assertEqual(self.entries(b'{"log": {"version": "1.2"}}'), [])
+        self.assertEqual(self.entries(b'{"log": {"entries": []}}'), [])
+
+    def test_truncated_file(self):
+        data = make_har([make_entry(response_text='x' * 100)])
+        with self.assertRaises(TruncatedHarError):
+            self.entries(data[:len(data) // 2])
+        with self.assertRaises(ValueError):
+            self.entries(b'[1, 2]')
+
+class HarFollowerTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def entry(self, i):
+        return json.dumps(make_entry('http://example.com/%d' % i, response_text='body "%d"' % i)).encode('utf-8')
+
+    def append(self, path, data):
+        with open(path, 'ab') as f:
+            f.write(data)
+
+    def check(self, path, found, numbers):
+        # The polled entries are `numbers`, with body spans into the file
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.assertEqual([entry['request']['url'] for entry, spans in found],
+                         ['http://example.com/%d' % i for i in numbers])
+        for (entry, spans), i in zip(found, numbers):
+            offset, length, escaped = spans[1]
+            self.assertEqual(data[offset:offset + length], ('body \\"%d\\"' % i).encode('ascii'))
+
+    def test_growing_har(self):
+        path = os.path.join(self.root, 'capture.har')
+        self.append(path, b'{"log": {"version": "1.2", "creator": {"name": "x"}, "ent')
+        follower = HarFollower(path)
+        self.assertEqual(follower.poll(), [])
+        self.append(path, b'ries": [' + self.entry(0) + b',\n' + self.entry(1)[:40])
+        self.check(path, follower.poll(), [0])
+        self.assertEqual(follower.poll(), [])
+        self.append(path, self.entry(1)[40:] + b',' + self.entry(2) + b',' + self.entry(3))
+        self.check(path, follower.poll(2), [1, 2])
+        self.check(path, follower.poll(), [3])
+        self.assertFalse(follower.closed)
+        self.append(path, b'\n]}}')
+        self.assertEqual(follower.poll(), [])
+        self.assertTrue(follower.closed)
+
+    def test_growing_ndjson(self):
+        path = os.path.join(self.root, 'capture.ndjson')
+        self.append(path, self.entry(0) + b'\n' + self.entry(1) + b'\n' + self.entry(2)[:-5])
+        follower = HarFollower(path)
+        self.check(path, follower.poll(), [0, 1])
+        self.append(path, self.entry(2)[-5:] + b'\n')
+        self.check(path, follower.poll(), [2])
+
+    def test_ndjson_detected_from_content(self):
+        path = os.path.join(self.root, 'capture.log')
+        self.append(path, b'\xef\xbb\xbf' + self.entry(0) + b'\n' + self.entry(1) + b'\n')
+        follower = HarFollower(path)
+        self.check(path, follower.poll(), [0, 1])
+        self.assertTrue(follower.ndjson)
+
+    def test_invalid(self):
+        path = os.path.join(self.root, 'capture.har')
+        self.append(path, b'{"log": {"entries": [' + self.entry(0) + b',' + self.entry(1))
+        follower = HarFollower(path)
+        self.check(path, follower.poll(), [0, 1])
+        with open(path, 'wb') as f:
+            f.write(b'{"log": {"entries": [')
+        self.assertRaises(ValueError, follower.poll)
+
+        path = os.path.join(self.root, 'other.ndjson')
+        self.append(path, b'{"name": "not an entry"}\n')
+        self.assertRaises(ValueError, HarFollower(path).poll)
+
+        path = os.path.join(self.root, 'capture.har.gz')
+        with gzip.open(path, 'wb') as f:
+            f.write(make_har([]))
+        self.assertRaises(ValueError, HarFollower, path)
+
+class MessageBuilderTest(unittest.TestCase):
+    def build(self, entry, data=None, max_body_size=None):
+        builder = MessageBuilder(max_body_size)
+        raw_bodies = (None, None)
+        if data is not None:
+            [(entry, spans)] = list(HarStreamReader(io.BytesIO(data)).entries())
+            raw_bodies = read_bodies(BytesBodyStore(data), spans, builder.raw_limit())
+        return builder.build(entry, raw_bodies)
+
+    def body(self, message):
+        return message.split(b'\r\n\r\n', 1)[1]
+
+    def test_request_and_response(self):
+        entry = make_entry(url='https://example.com:8443/p?q=1', method='POST', request_text='a=1',
+                           response_text='hello')
+        host, port, protocol, request, response, key = self.build(entry)
+        self.assertEqual((host, port, protocol), ('example.com', 8443, 'https'))
+        self.assertEqual(request, b'POST /p?q=1 HTTP/1.1\r\nHost: example.com\r\n\r\na=1')
+        self.assertEqual(response, b'HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\n\r\nhello')
+
+    def test_host_header_added_when_missing(self):
+        entry = make_entry(url='http://example.com/', headers=[{'name': 'Accept', 'value': '*/*'}])
+        request = self.build(entry)[3]
+        self.assertTrue(request.startswith(b'GET / HTTP/1.1\r\nHost: example.com\r\nAccept: */*\r\n'))
+
+    def test_compact_entry_builds_the_same_message(self):
+        entry = make_entry(method='POST', request_text='a=1', response_text=u'café')
+        self.assertEqual(self.build(compact_entry(entry)), self.build(entry))
+
+    def test_string_and_float_status(self):
+        for status in ('404', 404.0, ' 404 '):
+            entry = make_entry(status=status, response_text='gone')
+            self.assertEqual(compact_entry(entry)[4], 404)
+            self.assertTrue(self.build(entry)[4].startswith(b'HTTP/1.1 404 OK\r\n'))
+        self.assertTrue(self.build(make_entry(status=None))[4].startswith(b'HTTP/1.1 0 OK\r\n'))
+
+    def test_base64(self):
+        payload = bytes(bytearray(range(256)))
+        text = base64.b64encode(payload).decode('ascii')
+        entry = make_entry(response_text=text, mime_type='image/png', encoding='base64')
+        self.assertEqual(self.body(self.build(entry)[4]), payload)
+        self.assertEqual(self.body(self.build(entry, make_har([entry]))[4]), payload)
+
+    def test_base64_with_line_breaks_and_no_padding(self):
+        text = base64.b64encode(b'abcd').decode('ascii').rstrip('=')
+        entry = make_entry(response_text=text[:3] + '\r\n' + text[3:], encoding='base64')
+        self.assertEqual(self.body(self.build(entry)[4]), b'abcd')
+        self.assertEqual(self.body(self.build(entry, make_har([entry]))[4]), b'abcd')
+
+    def test_truncation(self):
+        entry = make_entry(response_text='x' * 100)
+        self.assertEqual(self.body(self.build(entry, max_body_size=10)[4]), b'x' * 10)
+        self.assertEqual(self.body(self.build(entry, make_har([entry]), 10)[4]), b'x' * 10)
+
+    def test_truncated_base64_from_file(self):
+        payload = bytes(bytearray(range(256))) * 4
+        entry = make_entry(response_text=base64.b64encode(payload).decode('ascii'), encoding='base64')
+        for size in (1, 7, 100, 1023):
+            self.assertEqual(self.body(self.build(entry, make_har([entry]), size)[4]), payload[:size])
+
+    def test_truncated_escaped_text_from_file(self):
+        text = u'é"\\' * 50
+        entry = make_entry(response_text=text, mime_type='text/plain; charset=utf-8')
+        data = make_har([entry])
+        for size in (1, 2, 5, 30, 99):
+            body = self.body(self.build(entry, data, size)[4])
+            self.assertTrue(len(body) <= size)
+            self.assertTrue(text.encode('utf-8').startswith(body))
+
+class FindHarFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.root, 'sub'))
+        for name in ('b.har', 'a.HAR', 'notes.txt', 'access.log.gz', 'backup.tar.gz', os.path.join('sub', 'c.har.gz')):
+            open(os.path.join(self.root, name), 'wb').close()
+        for name, member in (('export.zip', 'capture.har'), ('other.zip', 'readme.txt')):
+            archive = zipfile.ZipFile(os.path.join(self.root, 'sub', name), 'w')
+            archive.writestr(member, '{}')
+            archive.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_directories_and_duplicates(self):
+        path = lambda *names: os.path.join(self.root, *names)
+        self.assertEqual(find_har_files([self.root]),
+                         [path('a.HAR'), path('b.har'), path('sub', 'c.har.gz'), path('sub', 'export.zip')])
+        self.assertEqual(find_har_files([path('b.har'), self.root, path('sub', '..', 'b.har'), path('sub')]),
+                         [path('b.har'), path('a.HAR'), path('sub', 'c.har.gz'), path('sub', 'export.zip')])
+        self.assertEqual(find_har_files([path('sub', 'other.zip')]), [path('sub', 'other.zip')])
+
+class HarIndexCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cache = HarIndexCache(os.path.join(self.root, 'cache'))
+        self.har = self.write('a.har', [make_entry('http://example.com/%d' % i, response_text='body %d' % i)
+                                        for i in range(20)])
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, name, entries):
+        path = os.path.join(self.root, name)
+        with open(path, 'wb') as f:
+            f.write(make_har(entries))
+        return path
+
+    def index(self, path):
+        rows, entries, bodies = HarRowIndex(), [], HarBodyIndex()
+        with open(path, 'rb') as f:
+            for entry, spans in HarStreamReader(f).entries():
+                rows.add(entry)
+                entries.append(compact_entry(entry))
+                bodies.add(spans)
+        return rows, entries, bodies
+
+    def state(self, indexes):
+        rows, entries, bodies = indexes
+        return rows.__getstate__()[:5], rows.search.__getstate__(), entries, bodies.__getstate__()
+
+    def test_round_trip(self):
+        self.assertEqual(self.cache.load(self.har), None)
+        indexes = self.index(self.har)
+        self.cache.save(self.har, *indexes)
+        loaded = HarIndexCache(self.cache.directory).load(self.har)
+        self.assertEqual(self.state(loaded), self.state(indexes))
+        self.assertEqual(list(HarFilter(path='/1').select(loaded[0], len(loaded[0]))), [1] + list(range(10, 20)))
+
+    def test_key(self):
+        self.cache.save(self.har, *self.index(self.har), key=('status', '200'))
+        self.assertEqual(self.cache.load(self.har), None)
+        self.assertEqual(self.cache.load(self.har, ('status', '300')), None)
+        self.assertTrue(self.cache.load(self.har, ('status', '200')))
+
+    def test_invalidated_when_the_file_changes(self):
+        self.cache.save(self.har, *self.index(self.har))
+        with open(self.har, 'rb') as f:
+            data = f.read()
+        with open(self.har, 'wb') as f:
+            f.write(data.replace(b'body 7', b'body X'))  # same size
+        self.assertEqual(self.cache.load(self.har), None)
+        self.cache.save(self.har, *self.index(self.har))
+        self.assertTrue(self.cache.load(self.har))
+        self.write('a.har', [make_entry()])
+        self.assertEqual(self.cache.load(self.har), None)
+
+    def test_other_version_or_corrupt_file(self):
+        self.cache.save(self.har, *self.index(self.har))
+        old = HarIndexCache(self.cache.directory)
+        old.VERSION = self.cache.VERSION - 1
+        self.assertEqual(old.load(self.har), None)
+        with open(self.cache.cache_path(self.har), 'r+b') as f:
+            f.truncate(os.path.getsize(f.name) // 2)
+        self.assertEqual(self.cache.load(self.har), None)
+
+    def test_eviction(self):
+        paths = [self.write('%d.har' % i, [make_entry(response_text='x' * 1000)] * 20) for i in range(3)]
+        for i, path in enumerate(paths):
+            self.cache.save(path, *self.index(path))
+            os.utime(self.cache.cache_path(path), (1000000 + i, 1000000 + i))
+        size = os.path.getsize(self.cache.cache_path(paths[0]))
+        self.cache.load(paths[0])  # now the most recently used
+        self.cache.max_bytes = 2 * size + size // 2
+        self.cache.evict()
+        self.assertEqual([os.path.exists(self.cache.cache_path(path)) for path in paths], [True, False, True])
+
+class DigestSetTest(unittest.TestCase):
+    def test_add_and_contains(self):
+        digests = DigestSet([5, 3, 5])
+        digests.MERGE_SIZE = 4
+        self.assertEqual(len(digests), 2)
+        values = [-(1 << 63), (1 << 63) - 1, 0, -1, 3] + [i * 7919 for i in range(1, 20)]
+        added = [digests.add(value) for value in values]
+        self.assertEqual(added, [True, True, True, True, False] + [True] * 19)
+        self.assertEqual(len(digests), 25)
+        for value in values + [5]:
+            self.assertTrue(value in digests)
+        for value in (1, 2, 4, 7918, 1 << 40):
+            self.assertFalse(value in digests)
+        digests.merge()
+        self.assertEqual(list(digests._sorted), sorted(set(values + [5])))
+
+class CheckpointStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.directory = os.path.join(self.root, 'checkpoints')
+        self.har = os.path.join(self.root, 'a.har')
+        with open(self.har, 'wb') as f:
+            f.write(make_har([make_entry('http://example.com/%d' % i) for i in range(10)]))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def import_entries(self, store, checkpoint, indexes):
+        # Records entries as imported, the way ImportWorker does
+        for index in indexes:
+            checkpoint.add(index)
+            store.record(pair_digest(('http', 'example.com', 80, 'request %d' % index, 'response')))
+
+    def test_resume_after_a_partial_import(self):
+        store = CheckpointStore(self.directory)
+        self.assertEqual(store.load(self.har), None)
+        checkpoint = ImportCheckpoint(10)
+        self.import_entries(store, checkpoint, range(4))
+        store.save(self.har, checkpoint)
+
+        resumed = CheckpointStore(self.directory).load(self.har)
+        self.assertEqual([index in resumed for index in range(10)], [True] * 4 + [False] * 6)
+        self.assertEqual((resumed.count(), resumed.last), (4, 3))
+        resumed.add(12)  # past the size it was created with
+        self.assertTrue(12 in resumed and 11 not in resumed)
+
+    def test_imported_pairs_are_remembered(self):
+        store = CheckpointStore(self.directory)
+        self.import_entries(store, ImportCheckpoint(10), range(3))
+        self.assertFalse(store.record(pair_digest(('http', 'example.com', 80, 'request 1', 'response'))))
+        store.flush()
+        store.flush()  # nothing pending
+        again = CheckpointStore(self.directory)
+        self.assertEqual(len(again.imported()), 3)
+        self.assertFalse(again.record(pair_digest(('http', 'example.com', 80, 'request 2', 'response'))))
+        self.assertTrue(again.record(pair_digest(('http', 'example.com', 80, 'request 3', 'response'))))
+
+    def test_partial_digest_at_the_end_of_the_log(self):
+        store = CheckpointStore(self.directory)
+        self.import_entries(store, ImportCheckpoint(10), range(3))
+        store.flush()
+        with open(os.path.join(self.directory, CheckpointStore.LOG_NAME), 'ab') as f:
+            f.write(b'\x01\x02\x03')
+        self.assertEqual(len(CheckpointStore(self.directory).imported()), 3)
+
+    def test_out_of_date(self):
+        store = CheckpointStore(self.directory)
+        checkpoint = ImportCheckpoint(10)
+        self.import_entries(store, checkpoint, range(2))
+        store.save(self.har, checkpoint, key=('status', '200'))
+        self.assertEqual(store.load(self.har), None)
+        self.assertTrue(store.load(self.har, ('status', '200')))
+        with open(self.har, 'ab') as f:
+            f.write(b'\n')
+        self.assertEqual(store.load(self.har, ('status', '200')), None)
+
+    def test_clear(self):
+        store = CheckpointStore(self.directory)
+        checkpoint = ImportCheckpoint(10)
+        self.import_entries(store, checkpoint, range(5))
+        store.save(self.har, checkpoint)
+        store.clear()
+        self.assertEqual(len(store.imported()), 0)
+        self.assertEqual(store.load(self.har), None)
+        self.assertEqual(len(CheckpointStore(self.directory).imported()), 0)
+
+class ParseSizeTest(unittest.TestCase):
+    def test_sizes(self):
+        self.assertEqual(parse_size('512'), 512)
+        self.assertEqual(parse_size(' 1.5k '), 1536)
+        self.assertEqual(parse_size('2M'), 2 * 1024 * 1024)
+        self.assertEqual(parse_size('1g'), 1024 ** 3)
+        self.assertEqual(parse_size('', 7), 7)
+
+    def test_invalid(self):
+        for text in ('x', 'k', 'inf', '-inf', '1e400', 'infk', 'nan'):
+            self.assertRaises(ValueError, parse_size, text)
+
+class ParseRangeTest(unittest.TestCase):
+    def test_ranges(self):
+        low, high = -sys.maxsize - 1, sys.maxsize
+        self.assertEqual(parse_range('404'), (404, 404))
+        self.assertEqual(parse_range(' 200 - 299 '), (200, 299))
+        self.assertEqual(parse_range('400-'), (400, high))
+        self.assertEqual(parse_range('-100'), (low, 100))
+        self.assertEqual(parse_range('>=1k'), (1024, high))
+        self.assertEqual(parse_range('>5'), (6, high))
+        self.assertEqual(parse_range('<2m'), (low, 2 * 1024 * 1024 - 1))
+        self.assertEqual(parse_range('<=1.5K'), (low, 1536))
+        self.assertEqual(parse_range(''), None)
+
+    def test_invalid(self):
+        for text in ('abc', '-', '1-x', '>', 'inf', '>=1e400', '-inf-0', 'nan'):
+            self.assertRaises(ValueError, parse_range, text)
+
+class ImportRulesTest(unittest.TestCase):
+    ENTRIES = [
+        make_entry('https://api.example.com/v1', 'GET', 200, mime_type='application/json'),
+        make_entry('https://cdn.example.com/a.png', 'GET', '304', mime_type='image/png'),
+        make_entry('http://www.example.org/login', 'post', 302.0, mime_type='text/html; charset=utf-8'),
+        make_entry('http://tracker.example.net/p', None, None, mime_type=None),
+        make_entry('https://API.Example.com:8443/v2', 'DELETE', '500', mime_type='Application/JSON'),
+    ]
+
+    def allowed(self, rules):
+        return [i for i, entry in enumerate(self.ENTRIES) if rules.allows(entry)]
+
+    def test_no_rules(self):
+        rules = ImportRules()
+        self.assertTrue(rules.is_empty() and rules.filters_nothing())
+        self.assertEqual(self.allowed(rules), [0, 1, 2, 3, 4])
+
+    def test_hosts(self):
+        self.assertEqual(self.allowed(ImportRules({'includeHosts': '*.example.com'})), [0, 1, 4])
+        self.assertEqual(self.allowed(ImportRules({'includeHosts': 'api.example.com, www.*'})), [0, 2, 4])
+        self.assertEqual(self.allowed(ImportRules({'excludeHosts': 'cdn.*  tracker.example.ne?'})), [0, 2, 4])
+        self.assertEqual(self.allowed(ImportRules({'includeHosts': '*.example.com', 'excludeHosts': 'cdn.*'})),
+                         [0, 4])
+
+    def test_methods_and_mime_types(self):
+        self.assertEqual(self.allowed(ImportRules({'methods': 'post,delete'})), [2, 4])
+        self.assertEqual(self.allowed(ImportRules({'includeMimeTypes': 'application/json'})), [0, 4])
+        self.assertEqual(self.allowed(ImportRules({'excludeMimeTypes': 'image/*, text/html'})), [0, 3, 4])
+
+    def test_status_as_number_or_string(self):
+        self.assertEqual(self.allowed(ImportRules({'status': '200-299'})), [0])
+        self.assertEqual(self.allowed(ImportRules({'status': '300-399'})), [1, 2])
+        self.assertEqual(self.allowed(ImportRules({'status': '>=500'})), [4])
+
+    def test_scope(self):
+        in_scope = lambda url: 'example.com' in url
+        rules = ImportRules({'inScopeOnly': True}, in_scope)
+        self.assertEqual(self.allowed(rules), [0, 1])
+        self.assertEqual(rules.key(), None)
+        self.assertTrue(ImportRules({'inScopeOnly': True}).filters_nothing())
+        failing = ImportRules({'inScopeOnly': True}, lambda url: 1 // 0)
+        self.assertEqual(self.allowed(failing), [])
+
+    def test_body_size_and_key(self):
+        rules = ImportRules({'maxBodySize': '1k'})
+        self.assertEqual(rules.maxBodySize, 1024)
+        self.assertTrue(rules.filters_nothing())
+        self.assertFalse(rules.is_empty())
+        self.assertEqual(rules.key(), ImportRules({'maxBodySize': '1k'}).key())
+        self.assertNotEqual(rules.key(), ImportRules({'maxBodySize': '2k'}).key())
+
+    def test_invalid(self):
+        for settings in ({'status': 'abc'}, {'maxBodySize': 'x'}, {'maxBodySize': '-1'}):
+            self.assertRaises(ValueError, ImportRules, settings)
+
+class HarRowIndexTest(unittest.TestCase):
+    def test_loose_numbers(self):
+        rows = HarRowIndex()
+        for status, size in ((200, 10), ('404', 1.0), (301.0, '2.5'), (None, None), ('', 'abc'),
+                             (float('nan'), float('inf')), (1 << 40, 1 << 70), (' 500 ', '-1')):
+            entry = make_entry(status=status)
+            entry['response']['content']['size'] = size
+            rows.add(entry)
+        self.assertEqual(list(rows.statuses), [200, 404, 301, 0, 0, 0, 0, 500])
+        self.assertEqual(list(rows.sizes), [10, 1, 2, 0, 0, 0, 0, -1])
+        self.assertEqual(list(HarFilter(status=parse_range('404')).select(rows, len(rows))), [1])
+
+    def test_null_strings(self):
+        rows = HarRowIndex()
+        entry = make_entry(method=None, mime_type=None)
+        entry['request']['url'] = None
+        rows.add(entry)
+        rows.add(make_entry(method='GET', mime_type='text/html'))
+        self.assertEqual((rows.methods[0], rows.urls[0], rows.mimeTypes[0]), ('', '', ''))
+        self.assertEqual(list(HarFilter(method='GET').select(rows, 2)), [1])
+        self.assertEqual(list(HarFilter(mime='html').select(rows, 2)), [1])
+
+    def test_extend_matches_adding_rows(self):
+        rows = [('GET', 'http://a.example/x/%d' % (i % 7), 200 + i % 3, i, 'text/html') for i in range(50)]
+        rows += [('POST', 'https://b.example:8443/y?q=%d' % i, 404, i, 'application/json') for i in range(30)]
+        rows += [('get', 'http://a.example/x/1', 200, 5, 'TEXT/HTML')]
+        merged, single = HarRowIndex(), HarRowIndex()
+        for start, end in ((0, 20), (20, 20), (20, 65), (65, len(rows))):
+            part = HarRowIndex()
+            for row in rows[start:end]:
+                part.add_row(*row)
+            merged.extend(part)
+        for row in rows:
+            single.add_row(*row)
+        self.assertEqual(merged.__getstate__()[:5], single.__getstate__()[:5])
+        self.assertEqual(merged.search.__getstate__(), single.search.__getstate__())
+
+class HarFilterTest(unittest.TestCase):
+    HOSTS = ('api.example.com', 'cdn.example.net', 'www.example.org')
+    PATHS = ('/api/v1/items', '/assets/app.js', '/users', '/search')
+    METHODS = ('GET', 'POST', 'HEAD')
+    STATUSES = (200, 304, 404, 500)
+    MIME_TYPES = ('application/json', 'text/html; charset=utf-8', 'image/png')
+
+    def setUp(self):
+        self.rows = HarRowIndex()
+        for i in range(2000):
+            url = 'https://%s%s/%d?page=%d' % (self.HOSTS[i % 3], self.PATHS[i % 4], i % 97, i)
+            self.rows.add_row(self.METHODS[i % 3 if i % 5 else 0], url, self.STATUSES[i % 7 % 4], (i * 37) % 5000,
+                              self.MIME_TYPES[i % 11 % 3])
+
+    def check(self, row_filter, count=None):
+        if count is None:
+            count = len(self.rows)
+        selected = list(row_filter.select(self.rows, count))
+        self.assertEqual(selected, [row for row in range(count) if row_filter.matches(self.rows, row)])
+        return selected
+
+    def test_single_criteria(self):
+        self.assertEqual(len(self.check(HarFilter(host='example'))), 2000)
+        self.assertTrue(self.check(HarFilter(host='API.example')))
+        self.assertTrue(self.check(HarFilter(path='items')))
+        self.assertTrue(self.check(HarFilter(path='/1')))
+        self.assertTrue(self.check(HarFilter(method='post')))
+        self.assertTrue(self.check(HarFilter(mime='json')))
+        self.assertTrue(self.check(HarFilter(status=parse_range('300-499'))))
+        self.assertTrue(self.check(HarFilter(size=parse_range('>=4k'))))
+        self.assertTrue(self.check(HarFilter(size=parse_range('100-200'))))
+
+    def test_combined_criteria(self):
+        self.assertTrue(self.check(HarFilter(host='example', path='items', method='GET')))
+        self.assertTrue(self.check(HarFilter(host='cdn', status=parse_range('200'), size=parse_range('<2k'))))
+        self.assertTrue(self.check(HarFilter(path='s', mime='html', status=parse_range('200-399'))))
+
+    def test_no_match(self):
+        self.assertEqual(self.check(HarFilter(host='nowhere')), [])
+        self.assertEqual(self.check(HarFilter(method='GET', status=parse_range('999'))), [])
+        self.assertEqual(self.check(HarFilter(path='items', size=parse_range('>1m'))), [])
+
+    def test_rows_not_yet_published(self):
+        self.check(HarFilter(method='GET'), 500)
+        self.check(HarFilter(path='items', status=parse_range('200')), 777)
+        self.check(HarFilter(size=parse_range('>1k')), 10)
+
+if __name__ == '__main__':
+    unittest.main()
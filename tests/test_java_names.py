@@ -0,0 +1,69 @@
+# Checks that the Jython modules never assign an attribute that Jython
+# exposes as a read-only bean property of a Java base class (a getter such
+# as SwingWorker.getState() becomes `state`). Such an assignment fails at
+# runtime in Burp but cannot be run outside a JVM, so the source is
+# checked instead:
+#
+#   python -m unittest discover tests
+import ast
+import os
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODULES = ('harui.py', 'harbringer.py')
+
+# Bean properties of the Java classes and interfaces the modules extend
+JAVA_PROPERTIES = {
+    'SwingWorker': ('state', 'progress', 'cancelled', 'done', 'propertyChangeSupport'),
+    'AbstractTableModel': ('rowCount', 'columnCount', 'tableModelListeners'),
+    'IHttpRequestResponse': ('comment', 'highlight', 'httpService', 'request', 'response'),
+    'IHttpService': ('host', 'port', 'protocol'),
+    'ITab': ('tabCaption', 'uiComponent'),
+}
+
+def assigned_attributes(node):
+    # (line, object, attribute) for each `object.attribute = ...` in node,
+    # with object 'self' for attributes of self and '' for anything else
+    for child in ast.walk(node):
+        if isinstance(child, ast.Assign):
+            targets = child.targets
+        elif isinstance(child, ast.AugAssign):
+            targets = [child.target]
+        else:
+            continue
+        for target in targets:
+            for item in ast.walk(target):
+                if isinstance(item, ast.Attribute) and isinstance(item.ctx, ast.Store):
+                    is_self = isinstance(item.value, ast.Name) and item.value.id == 'self'
+                    yield item.lineno, 'self' if is_self else '', item.attr
+
+class JavaNamesTest(unittest.TestCase):
+    def check(self, filename):
+        with open(os.path.join(HERE, '..', filename)) as f:
+            tree = ast.parse(f.read(), filename)
+        clashes = []
+        # Attributes of the Java subclasses themselves
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.ClassDef):
+                continue
+            names = set()
+            for base in node.bases:
+                if isinstance(base, ast.Name):
+                    names.update(JAVA_PROPERTIES.get(base.id, ()))
+            clashes.extend((line, node.name, attr) for line, obj, attr in assigned_attributes(node)
+                           if obj == 'self' and attr in names)
+        # Workers and table models are also updated from other classes
+        # (a batch load sets its per-file LoadWorkers' progress)
+        shared = set(JAVA_PROPERTIES['SwingWorker'] + JAVA_PROPERTIES['AbstractTableModel'])
+        clashes.extend((line, obj, attr) for line, obj, attr in assigned_attributes(tree)
+                       if obj != 'self' and attr in shared)
+        self.assertEqual(sorted(set(clashes)), [])
+
+    def test_harui(self):
+        self.check('harui.py')
+
+    def test_harbringer(self):
+        self.check('harbringer.py')
+
+if __name__ == '__main__':
+    unittest.main()